@@ -12,11 +12,15 @@ load_dotenv()
 
 # Initialize Flask app
 app = Flask(__name__)
+# ObjectId and datetime values from MongoDB are serialized as they are
+from app import json_provider
+app.json = json_provider.BSONJSONProvider(app)
 app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'dev-key-change-in-production')
 app.config['JWT_SECRET_KEY'] = os.environ.get('JWT_SECRET_KEY', 'jwt-dev-key-change-in-production')
 
 # Configure MongoDB
 app.config['MONGO_URI'] = os.environ.get('MONGO_URI', 'mongodb://localhost:27017/videmaison')
+app.config['MONGO_ENSURE_INDEXES'] = os.environ.get('MONGO_ENSURE_INDEXES', 'True').lower() in ['true', '1', 't']
 mongo_client = MongoClient(app.config['MONGO_URI'])
 db = mongo_client.get_database()
 
@@ -28,11 +32,64 @@ app.config['MAIL_USERNAME'] = os.environ.get('MAIL_USERNAME')
 app.config['MAIL_PASSWORD'] = os.environ.get('MAIL_PASSWORD')
 app.config['MAIL_DEFAULT_SENDER'] = os.environ.get('MAIL_DEFAULT_SENDER')
 
+# Background email delivery (set MAIL_ASYNC=False to send inline)
+app.config['MAIL_ASYNC'] = os.environ.get('MAIL_ASYNC', 'True').lower() in ['true', '1', 't']
+app.config['MAIL_QUEUE_SIZE'] = int(os.environ.get('MAIL_QUEUE_SIZE', 500))
+app.config['MAIL_WORKERS'] = int(os.environ.get('MAIL_WORKERS', 2))
+app.config['MAIL_MAX_RETRIES'] = int(os.environ.get('MAIL_MAX_RETRIES', 3))
+app.config['MAIL_RETRY_BACKOFF'] = float(os.environ.get('MAIL_RETRY_BACKOFF', 2.0))
+app.config['MAIL_IDLE_TIMEOUT'] = float(os.environ.get('MAIL_IDLE_TIMEOUT', 30))
+
+# Email templates are compiled from the frontend locale files
+app.config['EMAIL_LOCALES_DIR'] = os.environ.get(
+    'EMAIL_LOCALES_DIR',
+    os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'src', 'i18n', 'locales'))
+)
+
+# Rate limiting storage shared by all workers ('memory' or 'redis')
+app.config['RATE_LIMIT_STORAGE'] = os.environ.get('RATE_LIMIT_STORAGE', 'memory')
+app.config['REDIS_URL'] = os.environ.get('REDIS_URL', 'redis://localhost:6379/0')
+app.config['RATE_LIMIT_MAX_KEYS'] = int(os.environ.get('RATE_LIMIT_MAX_KEYS', 100000))
+app.config['RATE_LIMIT_SWEEP_INTERVAL'] = float(os.environ.get('RATE_LIMIT_SWEEP_INTERVAL', 60))
+
+# CSRF tokens ('memory' or 'redis' so any worker can validate them)
+app.config['CSRF_TOKEN_STORAGE'] = os.environ.get('CSRF_TOKEN_STORAGE', 'memory')
+app.config['CSRF_TOKEN_TTL'] = int(os.environ.get('CSRF_TOKEN_TTL', 3600))
+
+# Password hashing runs on a bounded thread pool off the event loop
+app.config['PASSWORD_HASH_ROUNDS'] = int(os.environ.get('PASSWORD_HASH_ROUNDS', 29000))
+app.config['PASSWORD_HASH_WORKERS'] = int(os.environ.get('PASSWORD_HASH_WORKERS', 4))
+app.config['PASSWORD_HASH_QUEUE_TIMEOUT'] = float(os.environ.get('PASSWORD_HASH_QUEUE_TIMEOUT', 5))
+
+# Login sessions expire with the refresh token; last_activity is written in batches
+app.config['LOGIN_SESSION_TTL'] = int(os.environ.get('LOGIN_SESSION_TTL', 30 * 24 * 3600))
+app.config['SESSION_ACTIVITY_FLUSH_INTERVAL'] = float(os.environ.get('SESSION_ACTIVITY_FLUSH_INTERVAL', 60))
+
+# Per-process cache of the user fields checked by JWT-protected endpoints
+app.config['PRINCIPAL_CACHE_TTL'] = float(os.environ.get('PRINCIPAL_CACHE_TTL', 30))
+app.config['PRINCIPAL_CACHE_SIZE'] = int(os.environ.get('PRINCIPAL_CACHE_SIZE', 10000))
+
+# Socket.IO fan-out between workers: a redis:// URL in production, inprocess:// for
+# tests, unset for a single process
+app.config['SOCKETIO_MESSAGE_QUEUE'] = os.environ.get('SOCKETIO_MESSAGE_QUEUE')
+app.config['SOCKETIO_CHANNEL'] = os.environ.get('SOCKETIO_CHANNEL', 'videmaison')
+# Broadcasts to a room are coalesced over this window (0 sends every event at once)
+app.config['SOCKETIO_EMIT_WINDOW_MS'] = float(os.environ.get('SOCKETIO_EMIT_WINDOW_MS', 75))
+app.config['SOCKETIO_EMIT_MAX_BATCH'] = int(os.environ.get('SOCKETIO_EMIT_MAX_BATCH', 100))
+# Who is connected, so events for offline users are not emitted ('memory' or 'redis' across workers)
+app.config['PRESENCE_STORAGE'] = os.environ.get('PRESENCE_STORAGE', 'memory')
+
 # Initialize extensions
 # Remove this line: cors = CORS(app, resources={r"/*": {"origins": "*"}})
 jwt = JWTManager(app)
 mail = Mail(app)
-socketio = SocketIO(app, cors_allowed_origins=["http://localhost:3000", "http://127.0.0.1:3000"])
+from app.services.socketio_queue import socketio_queue_options
+socketio = SocketIO(
+    app,
+    cors_allowed_origins=["http://localhost:3000", "http://127.0.0.1:3000"],
+    json=json_provider,
+    **socketio_queue_options(app.config)
+)
 
 # Import routes
 from app.routes import auth_routes, service_routes, admin_routes, chat_routes
@@ -43,6 +100,17 @@ app.register_blueprint(service_routes.bp)
 app.register_blueprint(admin_routes.bp)
 app.register_blueprint(chat_routes.bp)
 
+# CLI commands (flask ensure-indexes, flask check-query-plans)
+from app import commands
+
+# Apply the index registry at startup, it is a no-op when the indexes already exist
+if app.config['MONGO_ENSURE_INDEXES']:
+    from app.models.indexes import ensure_indexes
+    try:
+        ensure_indexes()
+    except Exception as e:
+        app.logger.warning(f"Could not ensure MongoDB indexes: {e}")
+
 # Create .env file if it doesn't exist
 if not os.path.exists('.env'):
     with open('.env', 'w') as f:
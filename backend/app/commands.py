@@ -0,0 +1,50 @@
+from app import app
+from app.models.indexes import ensure_indexes, check_query_plans
+from app.models.chat import Chat
+from app.models.login_session import LoginSession
+from app.models.service_request import ServiceRequest
+import click
+
+
+@app.cli.command('ensure-indexes')
+def ensure_indexes_command():
+    """Create the indexes declared on the models"""
+    for collection, names in ensure_indexes().items():
+        click.echo(f"{collection}: {', '.join(names)}")
+
+
+@app.cli.command('check-query-plans')
+def check_query_plans_command():
+    """Fail if any registered query shape would scan a whole collection"""
+    failures = 0
+    for result in check_query_plans():
+        status = 'COLLSCAN' if result['collection_scan'] else 'ok'
+        click.echo(f"[{status}] {result['collection']}.{result['name']}: {' > '.join(result['stages'])}")
+        failures += result['collection_scan']
+
+    if failures:
+        raise click.ClickException(f"{failures} query shape(s) would scan a collection")
+
+
+@app.cli.command('backfill-conversation-ids')
+@click.option('--batch-size', default=1000, show_default=True)
+def backfill_conversation_ids_command(batch_size):
+    """Add conversation_id to chat messages created before it was stored"""
+    updated = Chat.backfill_conversation_ids(batch_size=batch_size)
+    click.echo(f"Backfilled {updated} message(s)")
+
+
+@app.cli.command('migrate-login-sessions')
+@click.option('--batch-size', default=500, show_default=True)
+def migrate_login_sessions_command(batch_size):
+    """Move sessions embedded in user documents to the login_sessions collection"""
+    migrated = LoginSession.migrate_embedded_sessions(batch_size=batch_size)
+    click.echo(f"Migrated {migrated} session(s)")
+
+
+@app.cli.command('backfill-search-prefixes')
+@click.option('--batch-size', default=1000, show_default=True)
+def backfill_search_prefixes_command(batch_size):
+    """Index the email and phone fragments of service requests created before search existed"""
+    updated = ServiceRequest.backfill_search_prefixes(batch_size=batch_size)
+    click.echo(f"Backfilled {updated} request(s)")
@@ -0,0 +1,77 @@
+"""JSON encoding shared by Flask responses and Socket.IO packets.
+
+ObjectId, Decimal128 and datetime values are serialized as they come out of
+MongoDB, so models and routes no longer convert them by hand. Naive datetimes
+are stored in UTC and are written as ISO 8601 with a trailing Z. orjson is used
+when it is installed, the standard library otherwise, with the same output.
+"""
+from bson import ObjectId
+from bson.decimal128 import Decimal128
+from datetime import date, datetime
+from decimal import Decimal
+from flask.json.provider import JSONProvider
+import json
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+
+def json_default(value):
+    """Encode the BSON (and, without orjson, datetime) types the encoder does not know"""
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, Decimal128):
+        # As a string so no precision is lost on the way to the client
+        return str(value.to_decimal())
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            return value.isoformat() + 'Z'
+        return value.isoformat().replace('+00:00', 'Z')
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    if hasattr(value, '__html__'):
+        return str(value.__html__())
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+if orjson is not None:
+    ORJSON_OPTIONS = orjson.OPT_NAIVE_UTC | orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+
+    def dumps_bytes(obj):
+        return orjson.dumps(obj, default=json_default, option=ORJSON_OPTIONS)
+
+    def loads(s, **kwargs):
+        return orjson.loads(s)
+else:
+    def dumps_bytes(obj):
+        return json.dumps(obj, default=json_default, ensure_ascii=False, separators=(',', ':')).encode()
+
+    def loads(s, **kwargs):
+        return json.loads(s)
+
+
+def dumps(obj, **kwargs):
+    # Socket.IO passes separators=..., the output is always compact
+    return dumps_bytes(obj).decode()
+
+
+class BSONJSONProvider(JSONProvider):
+    """Flask JSON provider for documents straight from pymongo"""
+
+    mimetype = 'application/json'
+
+    def dumps(self, obj, **kwargs):
+        return dumps(obj)
+
+    def loads(self, s, **kwargs):
+        return loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(dumps_bytes(obj), mimetype=self.mimetype)
@@ -0,0 +1,76 @@
+from app import app
+import heapq
+import threading
+import time
+
+
+class MemoryCsrfTokenStore:
+    """Per-process CSRF tokens indexed by token, expired through a min-heap"""
+
+    def __init__(self):
+        self.tokens = {}
+        self.user_tokens = {}
+        self.expiry_heap = []
+        self.lock = threading.Lock()
+
+    def save(self, token, user_id, ttl):
+        """Store a token for user_id, replacing the user's previous one"""
+        expires = time.monotonic() + ttl
+        with self.lock:
+            self._evict_expired()
+            previous = self.user_tokens.get(user_id)
+            if previous:
+                self.tokens.pop(previous, None)
+            self.tokens[token] = (user_id, expires)
+            self.user_tokens[user_id] = token
+            heapq.heappush(self.expiry_heap, (expires, token))
+
+    def get_user(self, token):
+        """User the token belongs to, None if unknown or expired"""
+        with self.lock:
+            self._evict_expired()
+            entry = self.tokens.get(token)
+            return entry[0] if entry else None
+
+    def _evict_expired(self):
+        now = time.monotonic()
+        while self.expiry_heap and self.expiry_heap[0][0] <= now:
+            expires, token = heapq.heappop(self.expiry_heap)
+            entry = self.tokens.get(token)
+            # Skip heap entries for tokens already replaced by a newer one
+            if entry and entry[1] == expires:
+                del self.tokens[token]
+                if self.user_tokens.get(entry[0]) == token:
+                    del self.user_tokens[entry[0]]
+
+
+class RedisCsrfTokenStore:
+    """CSRF tokens shared by every worker, expired by Redis key TTLs"""
+
+    def __init__(self, client, prefix='csrf:'):
+        self.client = client
+        self.prefix = prefix
+
+    def save(self, token, user_id, ttl):
+        ttl_ms = int(ttl * 1000)
+        pipe = self.client.pipeline()
+        pipe.set(f'{self.prefix}user:{user_id}', token, px=ttl_ms, get=True)
+        pipe.set(f'{self.prefix}{token}', user_id, px=ttl_ms)
+        previous = pipe.execute()[0]
+        if previous:
+            self.client.delete(f'{self.prefix}{previous.decode()}')
+
+    def get_user(self, token):
+        user_id = self.client.get(f'{self.prefix}{token}')
+        return user_id.decode() if user_id else None
+
+
+def create_csrf_token_store(config):
+    """Store selected by CSRF_TOKEN_STORAGE ('memory' or 'redis')"""
+    if config.get('CSRF_TOKEN_STORAGE') == 'redis':
+        import redis
+        return RedisCsrfTokenStore(redis.Redis.from_url(config['REDIS_URL']))
+    return MemoryCsrfTokenStore()
+
+
+csrf_token_store = create_csrf_token_store(app.config)
@@ -0,0 +1,55 @@
+from flask import request, make_response
+from functools import wraps
+from datetime import timezone
+import hashlib
+
+
+def make_etag(*parts):
+    """Short strong validator from the parts that determine a response"""
+    return hashlib.sha1('|'.join(str(part) for part in parts).encode()).hexdigest()[:32]
+
+
+def http_date(value):
+    # Stored datetimes are naive UTC; HTTP dates have one-second resolution
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.replace(microsecond=0)
+
+
+def is_not_modified(etag, last_modified=None):
+    # If-None-Match wins over If-Modified-Since when both are sent (RFC 9110 13.2.2)
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag)
+    if last_modified and request.if_modified_since:
+        return http_date(last_modified) <= request.if_modified_since
+    return False
+
+
+def conditional(validators, cache_control='private, no-cache'):
+    """Answer GETs with 304 from cheap validators, before the view builds its body.
+
+    `validators(**view_args)` returns (etag, last_modified) or None to skip caching,
+    e.g. when the resource does not exist and the view should answer 404 itself.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            current = validators(**kwargs)
+            if current is None:
+                return f(*args, **kwargs)
+
+            etag, last_modified = current
+            if is_not_modified(etag, last_modified):
+                response = make_response('', 304)
+            else:
+                response = make_response(f(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+
+            response.set_etag(etag)
+            if last_modified:
+                response.last_modified = http_date(last_modified)
+            response.headers['Cache-Control'] = cache_control
+            return response
+        return decorated_function
+    return decorator
@@ -0,0 +1,149 @@
+from app import app
+from collections import namedtuple, OrderedDict
+import threading
+import time
+
+RateLimitResult = namedtuple('RateLimitResult', ['allowed', 'remaining', 'retry_after'])
+
+
+class RateLimitState:
+    """Constant-size limiter state for one key"""
+
+    __slots__ = ('tat', 'blocked_until')
+
+    def __init__(self):
+        # Theoretical arrival time of the next request (GCRA)
+        self.tat = 0.0
+        self.blocked_until = 0.0
+
+
+class MemoryRateLimitStorage:
+    """Per-process GCRA storage with LRU-capped, idle-swept state"""
+
+    def __init__(self, max_keys=100000, sweep_interval=60):
+        self.states = OrderedDict()
+        self.max_keys = max_keys
+        self.sweep_interval = sweep_interval
+        self.next_sweep = time.monotonic() + sweep_interval
+        self.evicted_lru = 0
+        self.evicted_idle = 0
+        self.lock = threading.Lock()
+
+    def hit(self, key, limit, window):
+        """Allow up to `limit` requests per `window` seconds for key, bursts included"""
+        now = time.monotonic()
+        interval = window / limit
+        with self.lock:
+            state = self._state(key, now)
+            new_tat = max(state.tat, now) + interval
+            allow_at = new_tat - window
+            if now < allow_at:
+                return RateLimitResult(False, 0, allow_at - now)
+            state.tat = new_tat
+            return RateLimitResult(True, int(round((window - (new_tat - now)) / interval, 6)), 0)
+
+    def block(self, key, duration):
+        now = time.monotonic()
+        with self.lock:
+            self._state(key, now).blocked_until = now + duration
+
+    def blocked_for(self, key):
+        """Seconds left on a block, 0 when the key is not blocked"""
+        with self.lock:
+            state = self.states.get(key)
+            if state is None:
+                return 0
+            return max(state.blocked_until - time.monotonic(), 0)
+
+    def stats(self):
+        with self.lock:
+            return {
+                'backend': 'memory',
+                'live_keys': len(self.states),
+                'evicted_lru': self.evicted_lru,
+                'evicted_idle': self.evicted_idle
+            }
+
+    def _state(self, key, now):
+        if now >= self.next_sweep:
+            self._sweep(now)
+
+        state = self.states.get(key)
+        if state is None:
+            state = self.states[key] = RateLimitState()
+            if len(self.states) > self.max_keys:
+                self.states.popitem(last=False)
+                self.evicted_lru += 1
+        else:
+            self.states.move_to_end(key)
+        return state
+
+    def _sweep(self, now):
+        # A key whose TAT and block are both in the past behaves exactly like a missing one
+        idle = [key for key, state in self.states.items() if state.tat <= now and state.blocked_until <= now]
+        for key in idle:
+            del self.states[key]
+        self.evicted_idle += len(idle)
+        self.next_sweep = now + self.sweep_interval
+
+
+class RedisRateLimitStorage:
+    """GCRA storage shared by every worker, one expiring Redis key per client"""
+
+    # Read and advance the theoretical arrival time atomically; timestamps come from
+    # the Redis clock so workers on different hosts agree, and the key expires once idle.
+    HIT_SCRIPT = """
+    local time = redis.call('TIME')
+    local now = tonumber(time[1]) * 1000 + tonumber(time[2]) / 1000
+    local window = tonumber(ARGV[1])
+    local interval = window / tonumber(ARGV[2])
+    local tat = tonumber(redis.call('GET', KEYS[1])) or now
+    if tat < now then
+        tat = now
+    end
+    local new_tat = tat + interval
+    local allow_at = new_tat - window
+    if now < allow_at then
+        return {0, 0, math.ceil(allow_at - now)}
+    end
+    redis.call('SET', KEYS[1], tostring(new_tat), 'PX', math.ceil(new_tat - now))
+    return {1, math.floor((window - (new_tat - now)) / interval), 0}
+    """
+
+    def __init__(self, client, prefix='ratelimit:'):
+        self.client = client
+        self.prefix = prefix
+        self.hit_script = client.register_script(self.HIT_SCRIPT)
+
+    def hit(self, key, limit, window):
+        allowed, remaining, retry_after_ms = self.hit_script(
+            keys=[self.prefix + key],
+            args=[window * 1000, limit]
+        )
+        return RateLimitResult(bool(allowed), remaining, retry_after_ms / 1000)
+
+    def block(self, key, duration):
+        self.client.set(f'{self.prefix}block:{key}', 1, px=int(duration * 1000))
+
+    def blocked_for(self, key):
+        ttl = self.client.pttl(f'{self.prefix}block:{key}')
+        return ttl / 1000 if ttl > 0 else 0
+
+    def stats(self):
+        # Idle keys expire in Redis itself; counting them walks the keyspace, so keep it for diagnostics
+        live_keys = sum(1 for _ in self.client.scan_iter(match=f'{self.prefix}*', count=1000))
+        return {'backend': 'redis', 'live_keys': live_keys}
+
+
+def create_rate_limit_storage(config):
+    """Storage selected by RATE_LIMIT_STORAGE ('memory' or 'redis')"""
+    if config.get('RATE_LIMIT_STORAGE') == 'redis':
+        import redis
+        return RedisRateLimitStorage(redis.Redis.from_url(config['REDIS_URL']))
+    return MemoryRateLimitStorage(
+        max_keys=config.get('RATE_LIMIT_MAX_KEYS', 100000),
+        sweep_interval=config.get('RATE_LIMIT_SWEEP_INTERVAL', 60)
+    )
+
+
+rate_limit_storage = create_rate_limit_storage(app.config)
@@ -1,21 +1,29 @@
 from flask import request, jsonify, current_app
 from functools import wraps
-import time
 import hashlib
 import hmac
 import secrets
-from datetime import datetime, timedelta
 import re
+from app.middleware.rate_limiter import rate_limit_storage
+from app.middleware.csrf_store import csrf_token_store
 
 class SecurityMiddleware:
-    def __init__(self, app=None):
+    def __init__(self, app=None, storage=None, csrf_store=None):
         self.app = app
-        self.rate_limit_storage = {}
-        self.blocked_ips = {}
-        self.csrf_tokens = {}
+        self.storage = storage
+        self.csrf_store = csrf_store
         
     def init_app(self, app):
         self.app = app
+    
+    @property
+    def rate_limit_storage(self):
+        # Shared backend (memory or Redis) unless one was injected, e.g. in tests
+        return self.storage or rate_limit_storage
+    
+    @property
+    def csrf_tokens(self):
+        return self.csrf_store or csrf_token_store
         
     def rate_limit(self, max_requests=60, window=3600, block_duration=1800):
         """Advanced rate limiting with IP blocking"""
@@ -23,39 +31,28 @@ class SecurityMiddleware:
             @wraps(f)
             def decorated_function(*args, **kwargs):
                 client_ip = self.get_client_ip()
-                current_time = time.time()
+                key = f"security:{f.__name__}:{client_ip}"
+                block_key = f"security:{client_ip}"
+                storage = self.rate_limit_storage
                 
                 # Check if IP is blocked
-                if client_ip in self.blocked_ips:
-                    if current_time < self.blocked_ips[client_ip]:
-                        return jsonify({
-                            'error': 'IP temporarily blocked due to suspicious activity',
-                            'retry_after': int(self.blocked_ips[client_ip] - current_time)
-                        }), 429
-                    else:
-                        del self.blocked_ips[client_ip]
-                
-                # Initialize or clean request history
-                if client_ip not in self.rate_limit_storage:
-                    self.rate_limit_storage[client_ip] = []
-                
-                # Remove old requests outside the window
-                self.rate_limit_storage[client_ip] = [
-                    req_time for req_time in self.rate_limit_storage[client_ip]
-                    if current_time - req_time < window
-                ]
+                blocked_for = storage.blocked_for(block_key)
+                if blocked_for:
+                    return jsonify({
+                        'error': 'IP temporarily blocked due to suspicious activity',
+                        'retry_after': int(blocked_for)
+                    }), 429
                 
                 # Check rate limit
-                if len(self.rate_limit_storage[client_ip]) >= max_requests:
+                if not storage.hit(key, max_requests, window).allowed:
                     # Block IP for suspicious activity
-                    self.blocked_ips[client_ip] = current_time + block_duration
+                    storage.block(block_key, block_duration)
                     current_app.logger.warning(f"IP {client_ip} blocked for rate limit violation")
                     return jsonify({
                         'error': 'Rate limit exceeded. IP temporarily blocked.',
                         'retry_after': block_duration
                     }), 429
                 
-                self.rate_limit_storage[client_ip].append(current_time)
                 return f(*args, **kwargs)
             return decorated_function
         return decorator
@@ -111,19 +108,13 @@ class SecurityMiddleware:
     def generate_csrf_token(self, user_id):
         """Generate CSRF token for user"""
         token = secrets.token_urlsafe(32)
-        self.csrf_tokens[user_id] = {
-            'token': token,
-            'expires': datetime.utcnow() + timedelta(hours=1)
-        }
+        ttl = (self.app or current_app).config.get('CSRF_TOKEN_TTL', 3600)
+        self.csrf_tokens.save(token, str(user_id), ttl)
         return token
     
     def validate_csrf_token(self, token):
         """Validate CSRF token"""
-        for user_id, token_data in self.csrf_tokens.items():
-            if (token_data['token'] == token and 
-                datetime.utcnow() < token_data['expires']):
-                return True
-        return False
+        return self.csrf_tokens.get_user(token) is not None
     
     def get_client_ip(self):
         """Get real client IP address"""
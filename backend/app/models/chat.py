@@ -1,35 +1,100 @@
 from app import db
+from app.models.pagination import encode_cursor, before_cursor_filter, after_cursor_filter
+from app.models.read_watermark import ReadWatermark
 from datetime import datetime
 from bson.objectid import ObjectId
+from pymongo import IndexModel, ASCENDING, DESCENDING, UpdateOne
 
 class Chat:
+    COLLECTION = 'messages'
+    INDEXES = [
+        IndexModel([('conversation_id', ASCENDING), ('created_at', DESCENDING), ('_id', DESCENDING)], name='conversation_created_at_id'),
+        IndexModel([('receiver_id', ASCENDING), ('created_at', ASCENDING), ('_id', ASCENDING)], name='receiver_created_at_id')
+    ]
+    # Query shapes checked by `flask check-query-plans`
+    QUERY_SHAPES = [
+        {
+            'name': 'get_conversation',
+            'filter': {'conversation_id': 'user-a:user-b'},
+            'sort': [('created_at', -1), ('_id', -1)]
+        },
+        {
+            'name': 'count_unread',
+            'filter': {'conversation_id': 'user-a:user-b', 'receiver_id': 'user-a', 'read': False, 'created_at': {'$gt': datetime(2000, 1, 1)}}
+        },
+        {
+            'name': 'get_messages_since',
+            'filter': {'receiver_id': 'user-a', 'created_at': {'$gt': datetime(2000, 1, 1)}},
+            'sort': [('created_at', 1), ('_id', 1)]
+        }
+    ]
+    MAX_PAGE_SIZE = 100
+    # Missed messages are replayed in batches of REPLAY_BATCH_SIZE, at most REPLAY_MAX_BATCHES per join
+    REPLAY_BATCH_SIZE = 100
+    REPLAY_MAX_BATCHES = 5
+
+    @staticmethod
+    def conversation_key(user1_id, user2_id):
+        """Same key whichever side of the conversation asks"""
+        return ':'.join(sorted([str(user1_id), str(user2_id)]))
+
     @staticmethod
     def create_message(sender_id, receiver_id, content, message_type='text'):
+        # BSON dates keep milliseconds; truncating here makes cursors built from the
+        # returned document match the stored one exactly
+        now = datetime.utcnow()
+        created_at = now.replace(microsecond=now.microsecond // 1000 * 1000)
         message = {
+            'conversation_id': Chat.conversation_key(sender_id, receiver_id),
             'sender_id': sender_id,
             'receiver_id': receiver_id,
             'content': content,
             'message_type': message_type,
             'read': False,
-            'created_at': datetime.utcnow()
+            'created_at': created_at
         }
-        result = db.messages.insert_one(message)
-        message['_id'] = str(result.inserted_id)
+        db.messages.insert_one(message)
+        # insert_one already set message['_id'] to the new ObjectId
         return message
     
     @staticmethod
-    def get_conversation(user1_id, user2_id):
-        messages = list(db.messages.find({
-            '$or': [
-                {'sender_id': user1_id, 'receiver_id': user2_id},
-                {'sender_id': user2_id, 'receiver_id': user1_id}
-            ]
-        }).sort('created_at', 1))
+    def get_conversation(user1_id, user2_id, before=None, limit=50):
+        """Page of messages older than `before`, returned oldest first"""
+        filter_query = {'conversation_id': Chat.conversation_key(user1_id, user2_id)}
+        if before:
+            filter_query.update(before_cursor_filter(before))
+        
+        limit = min(max(limit, 1), Chat.MAX_PAGE_SIZE)
+        messages = list(
+            db.messages.find(filter_query)
+            .sort([('created_at', -1), ('_id', -1)])
+            .limit(limit + 1)
+        )
+        
+        next_before = None
+        if len(messages) > limit:
+            messages = messages[:limit]
+            next_before = encode_cursor(messages[-1])
+        
+        messages.reverse()
+        return messages, next_before
+    
+    @staticmethod
+    def get_messages_since(user_id, cursor, limit=REPLAY_BATCH_SIZE):
+        """Messages received after the cursor position, oldest first, plus the cursor to continue from"""
+        filter_query = {'receiver_id': user_id}
+        filter_query.update(after_cursor_filter(cursor))
         
-        for message in messages:
-            message['_id'] = str(message['_id'])
+        messages = list(
+            db.messages.find(filter_query)
+            .sort([('created_at', 1), ('_id', 1)])
+            .limit(limit + 1)
+        )
+        has_more = len(messages) > limit
+        messages = messages[:limit]
+        next_cursor = encode_cursor(messages[-1]) if messages else cursor
         
-        return messages
+        return messages, next_cursor, has_more
     
     @staticmethod
     def mark_as_read(message_id):
@@ -37,4 +102,69 @@ class Chat:
             {'_id': ObjectId(message_id)},
             {'$set': {'read': True}}
         )
-        return result.modified_count > 0
\ No newline at end of file
+        return result.modified_count > 0
+
+    @staticmethod
+    def mark_conversation_read(user_id, other_user_id, up_to=None, until=None):
+        """Mark everything the user received up to a message id or timestamp as read"""
+        conversation_id = Chat.conversation_key(user_id, other_user_id)
+        now = datetime.utcnow()
+        read_at = now
+        
+        if up_to:
+            if not ObjectId.is_valid(up_to):
+                return None
+            message = db.messages.find_one(
+                {'_id': ObjectId(up_to), 'conversation_id': conversation_id},
+                {'created_at': 1}
+            )
+            if not message:
+                return None
+            read_at = message['created_at']
+        elif until:
+            # A watermark in the future would hide messages that have not been sent yet
+            read_at = min(until, now)
+        
+        return ReadWatermark.advance(user_id, conversation_id, read_at)
+    
+    @staticmethod
+    def count_unread(user_id, other_user_id):
+        """Unread messages received from other_user_id, counted after the read watermark"""
+        conversation_id = Chat.conversation_key(user_id, other_user_id)
+        filter_query = {
+            'conversation_id': conversation_id,
+            'receiver_id': user_id,
+            'read': False
+        }
+        last_read_at = ReadWatermark.get(user_id, conversation_id)
+        if last_read_at:
+            filter_query['created_at'] = {'$gt': last_read_at}
+        return db.messages.count_documents(filter_query)
+
+    @staticmethod
+    def backfill_conversation_ids(batch_size=1000):
+        """Set conversation_id on messages stored before it existed, one batch at a time"""
+        updated = 0
+        last_id = None
+        while True:
+            filter_query = {'conversation_id': {'$exists': False}}
+            if last_id is not None:
+                filter_query['_id'] = {'$gt': last_id}
+            
+            batch = list(
+                db.messages.find(filter_query, {'sender_id': 1, 'receiver_id': 1})
+                .sort('_id', 1)
+                .limit(batch_size)
+            )
+            if not batch:
+                return updated
+            
+            result = db.messages.bulk_write([
+                UpdateOne(
+                    {'_id': message['_id']},
+                    {'$set': {'conversation_id': Chat.conversation_key(message['sender_id'], message['receiver_id'])}}
+                )
+                for message in batch
+            ], ordered=False)
+            updated += result.modified_count
+            last_id = batch[-1]['_id']
@@ -0,0 +1,23 @@
+from app import db
+from datetime import datetime
+
+class CollectionVersion:
+    """Per-collection change counter shared by every worker, used as a cheap cache validator"""
+    COLLECTION = 'collection_versions'
+
+    @staticmethod
+    def bump(collection):
+        """Record a write to collection; call it after the write itself"""
+        db.collection_versions.update_one(
+            {'_id': collection},
+            {'$inc': {'version': 1}, '$set': {'updated_at': datetime.utcnow()}},
+            upsert=True
+        )
+
+    @staticmethod
+    def get(collection):
+        """(version, updated_at) of collection, (0, None) before its first recorded write"""
+        document = db.collection_versions.find_one({'_id': collection})
+        if not document:
+            return 0, None
+        return document['version'], document['updated_at']
@@ -0,0 +1,70 @@
+from app import db
+from app.models.user import User
+from app.models.service_request import ServiceRequest
+from app.models.chat import Chat
+from app.models.read_watermark import ReadWatermark
+from app.models.login_session import LoginSession
+
+# Models whose INDEXES and QUERY_SHAPES are managed here
+REGISTERED_MODELS = [User, ServiceRequest, Chat, ReadWatermark, LoginSession]
+
+
+def ensure_indexes(models=None):
+    """Create every registered index; existing identical indexes are left untouched"""
+    created = {}
+    for model in models or REGISTERED_MODELS:
+        created[model.COLLECTION] = db[model.COLLECTION].create_indexes(model.INDEXES)
+    return created
+
+
+def plan_stages(plan):
+    """Flatten the stage names of an explain() plan tree"""
+    stages = []
+    if isinstance(plan, dict):
+        if 'stage' in plan:
+            stages.append(plan['stage'])
+        for value in plan.values():
+            stages.extend(plan_stages(value))
+    elif isinstance(plan, list):
+        for item in plan:
+            stages.extend(plan_stages(item))
+    return stages
+
+
+def winning_plans(explanation):
+    """Winning plans of an explain() result, wherever the server nests them (aggregations
+    report theirs under the first stage)"""
+    plans = []
+    if isinstance(explanation, dict):
+        for key, value in explanation.items():
+            if key == 'winningPlan':
+                plans.append(value)
+            else:
+                plans.extend(winning_plans(value))
+    elif isinstance(explanation, list):
+        for item in explanation:
+            plans.extend(winning_plans(item))
+    return plans
+
+
+def check_query_plans(models=None):
+    """Explain every registered query shape and report the ones that scan a collection"""
+    results = []
+    for model in models or REGISTERED_MODELS:
+        for shape in model.QUERY_SHAPES:
+            if 'pipeline' in shape:
+                explanation = db.command('aggregate', model.COLLECTION, pipeline=shape['pipeline'], explain=True)
+                stages = plan_stages(winning_plans(explanation))
+            else:
+                cursor = db[model.COLLECTION].find(shape['filter'])
+                if shape.get('sort'):
+                    cursor = cursor.sort(shape['sort'])
+                explanation = cursor.limit(shape.get('limit', 0)).explain()
+                stages = plan_stages(explanation['queryPlanner']['winningPlan'])
+            results.append({
+                'collection': model.COLLECTION,
+                'name': shape['name'],
+                'stages': stages,
+                'collection_scan': 'COLLSCAN' in stages
+            })
+    return results
@@ -0,0 +1,138 @@
+from app import app, db
+from datetime import datetime, timedelta
+from pymongo import IndexModel, ASCENDING, UpdateOne
+import atexit
+import threading
+import time
+
+class LoginSession:
+    """Login sessions in their own collection, removed by MongoDB once expires_at passes"""
+    COLLECTION = 'login_sessions'
+    INDEXES = [
+        IndexModel([('user_id', ASCENDING), ('session_id', ASCENDING)], name='user_session_unique', unique=True),
+        IndexModel([('expires_at', ASCENDING)], name='expires_at_ttl', expireAfterSeconds=0)
+    ]
+    # Query shapes checked by `flask check-query-plans`
+    QUERY_SHAPES = [
+        {'name': 'get_sessions', 'filter': {'user_id': 'user-a'}},
+        {'name': 'touch', 'filter': {'user_id': 'user-a', 'session_id': 'session-a'}}
+    ]
+
+    @staticmethod
+    def create(user_id, session_data, ttl=None):
+        now = datetime.utcnow()
+        ttl = ttl or timedelta(seconds=app.config['LOGIN_SESSION_TTL'])
+        db.login_sessions.update_one(
+            {'user_id': str(user_id), 'session_id': session_data['session_id']},
+            {'$setOnInsert': {
+                'ip_address': session_data.get('ip_address'),
+                'user_agent': session_data.get('user_agent'),
+                'login_time': now,
+                'last_activity': now,
+                'expires_at': now + ttl
+            }},
+            upsert=True
+        )
+
+    @staticmethod
+    def get_sessions(user_id):
+        return list(db.login_sessions.find({'user_id': str(user_id)}, {'user_id': 0}).sort('login_time', -1))
+
+    @staticmethod
+    def revoke(user_id, session_id):
+        activity_buffer.discard(str(user_id), session_id)
+        return db.login_sessions.delete_one({'user_id': str(user_id), 'session_id': session_id}).deleted_count > 0
+
+    @staticmethod
+    def migrate_embedded_sessions(batch_size=500, ttl=None):
+        """Move users.login_sessions into the collection and drop the embedded array"""
+        ttl = ttl or timedelta(seconds=app.config['LOGIN_SESSION_TTL'])
+        now = datetime.utcnow()
+        migrated = 0
+        while True:
+            users = list(db.users.find(
+                {'login_sessions': {'$exists': True}},
+                {'login_sessions': 1}
+            ).limit(batch_size))
+            if not users:
+                return migrated
+
+            operations = []
+            for user in users:
+                for session in user.get('login_sessions') or []:
+                    login_time = session.get('login_time') or session.get('last_activity') or now
+                    # Sessions that would already have expired are left behind
+                    if login_time + ttl <= now or not session.get('session_id'):
+                        continue
+                    operations.append(UpdateOne(
+                        {'user_id': str(user['_id']), 'session_id': session['session_id']},
+                        {'$setOnInsert': {
+                            'ip_address': session.get('ip_address'),
+                            'user_agent': session.get('user_agent'),
+                            'login_time': login_time,
+                            'last_activity': session.get('last_activity') or login_time,
+                            'expires_at': login_time + ttl
+                        }},
+                        upsert=True
+                    ))
+            if operations:
+                db.login_sessions.bulk_write(operations, ordered=False)
+                migrated += len(operations)
+
+            db.users.update_many(
+                {'_id': {'$in': [user['_id'] for user in users]}},
+                {'$unset': {'login_sessions': ''}}
+            )
+
+
+class SessionActivityBuffer:
+    """Collects last_activity per session in memory and writes them in one bulk_write"""
+
+    def __init__(self, flush_interval=60):
+        self.flush_interval = flush_interval
+        self.pending = {}
+        self.next_flush = time.monotonic() + flush_interval
+        self.lock = threading.Lock()
+        self.stats = {'touched': 0, 'flushed': 0, 'flushes': 0}
+
+    def touch(self, user_id, session_id, at=None):
+        """Record activity; the database sees it at the next flush, at most once per interval"""
+        at = at or datetime.utcnow()
+        with self.lock:
+            key = (str(user_id), session_id)
+            # Repeated activity on one session between flushes collapses into one write
+            if at > self.pending.get(key, datetime.min):
+                self.pending[key] = at
+            self.stats['touched'] += 1
+            due = time.monotonic() >= self.next_flush
+        if due:
+            self.flush()
+
+    def discard(self, user_id, session_id):
+        with self.lock:
+            self.pending.pop((str(user_id), session_id), None)
+
+    def flush(self):
+        with self.lock:
+            pending, self.pending = self.pending, {}
+            self.next_flush = time.monotonic() + self.flush_interval
+        if not pending:
+            return 0
+
+        operations = [
+            UpdateOne({'user_id': user_id, 'session_id': session_id}, {'$max': {'last_activity': at}})
+            for (user_id, session_id), at in pending.items()
+        ]
+        try:
+            db.login_sessions.bulk_write(operations, ordered=False)
+        except Exception as e:
+            app.logger.error(f"Error flushing session activity: {e}")
+            return 0
+        with self.lock:
+            self.stats['flushed'] += len(operations)
+            self.stats['flushes'] += 1
+        return len(operations)
+
+
+activity_buffer = SessionActivityBuffer(flush_interval=app.config['SESSION_ACTIVITY_FLUSH_INTERVAL'])
+atexit.register(activity_buffer.flush)
@@ -0,0 +1,42 @@
+from bson import ObjectId
+from datetime import datetime
+import base64
+import json
+
+
+def encode_cursor(document):
+    """Opaque continuation token for the (created_at, _id) position of a document"""
+    position = {
+        'created_at': document['created_at'].isoformat(),
+        'id': str(document['_id']),
+        'oid': isinstance(document['_id'], ObjectId)
+    }
+    return base64.urlsafe_b64encode(json.dumps(position).encode()).decode()
+
+
+def decode_cursor(token):
+    try:
+        position = json.loads(base64.urlsafe_b64decode(token.encode()))
+        created_at = datetime.fromisoformat(position['created_at'])
+        last_id = ObjectId(position['id']) if position.get('oid') else position['id']
+    except Exception:
+        raise ValueError('Invalid cursor')
+    return created_at, last_id
+
+
+def before_cursor_filter(token):
+    """Filter matching documents strictly older than the cursor position"""
+    created_at, last_id = decode_cursor(token)
+    return {'$or': [
+        {'created_at': {'$lt': created_at}},
+        {'created_at': created_at, '_id': {'$lt': last_id}}
+    ]}
+
+
+def after_cursor_filter(token):
+    """Filter matching documents strictly newer than the cursor position"""
+    created_at, last_id = decode_cursor(token)
+    return {'$or': [
+        {'created_at': {'$gt': created_at}},
+        {'created_at': created_at, '_id': {'$gt': last_id}}
+    ]}
@@ -0,0 +1,37 @@
+from app import db
+from datetime import datetime
+from pymongo import IndexModel, ASCENDING, ReturnDocument
+
+class ReadWatermark:
+    """Per-user, per-conversation position up to which messages have been read"""
+    COLLECTION = 'read_watermarks'
+    INDEXES = [
+        IndexModel([('user_id', ASCENDING), ('conversation_id', ASCENDING)], name='user_conversation_unique', unique=True)
+    ]
+    # Query shapes checked by `flask check-query-plans`
+    QUERY_SHAPES = [
+        {'name': 'get_watermark', 'filter': {'user_id': 'user-a', 'conversation_id': 'user-a:user-b'}}
+    ]
+
+    @staticmethod
+    def advance(user_id, conversation_id, read_at):
+        """Move the watermark forward, never back, and return its current value"""
+        watermark = db.read_watermarks.find_one_and_update(
+            {'user_id': user_id, 'conversation_id': conversation_id},
+            {
+                '$max': {'last_read_at': read_at},
+                '$set': {'updated_at': datetime.utcnow()}
+            },
+            projection={'last_read_at': 1},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        return watermark['last_read_at']
+
+    @staticmethod
+    def get(user_id, conversation_id):
+        watermark = db.read_watermarks.find_one(
+            {'user_id': user_id, 'conversation_id': conversation_id},
+            {'last_read_at': 1}
+        )
+        return watermark['last_read_at'] if watermark else None
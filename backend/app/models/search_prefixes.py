@@ -0,0 +1,66 @@
+import re
+
+# Fragments shorter than this match too many requests to be worth indexing
+MIN_FRAGMENT = 3
+# Longer fragments are looked up by their first MAX_FRAGMENT characters, then checked in full
+MAX_FRAGMENT = 12
+
+EMAIL_SEPARATORS = re.compile(r'[@._+\-]')
+PHONE_QUERY = re.compile(r'^[\d\s+().\-/]+$')
+NON_DIGITS = re.compile(r'\D')
+
+
+def email_fragments(email):
+    """Prefixes of the address starting at every part boundary: jean.dupont@gmail.com
+    is found by "jea", "dupont@g" or "gmail.c" """
+    # Form values are not always strings (a phone can arrive as a JSON number)
+    email = ('' if email is None else str(email)).strip().lower()
+    starts = [0] + [match.end() for match in EMAIL_SEPARATORS.finditer(email)]
+    fragments = set()
+    for start in starts:
+        tail = email[start:start + MAX_FRAGMENT]
+        for length in range(MIN_FRAGMENT, len(tail) + 1):
+            fragments.add(tail[:length])
+    return fragments
+
+
+def phone_fragments(phone):
+    """Every run of digits, so "470 12" finds +32 470 12 34 56 whatever the formatting"""
+    digits = NON_DIGITS.sub('', '' if phone is None else str(phone))
+    fragments = set()
+    for start in range(len(digits)):
+        tail = digits[start:start + MAX_FRAGMENT]
+        for length in range(MIN_FRAGMENT, len(tail) + 1):
+            fragments.add(tail[:length])
+    return fragments
+
+
+def search_prefixes(email, phone):
+    """Keys stored on a request for fragment search, e: for the email and p: for the phone"""
+    return sorted(
+        ['e:' + fragment for fragment in email_fragments(email)] +
+        ['p:' + fragment for fragment in phone_fragments(phone)]
+    )
+
+
+def is_phone_query(query):
+    return bool(PHONE_QUERY.match(query)) and len(NON_DIGITS.sub('', query)) >= MIN_FRAGMENT
+
+
+def fragment_filter(query):
+    """Filter matching requests whose email or phone contains the fragment"""
+    query = (query or '').strip().lower()
+    if is_phone_query(query):
+        fragment = NON_DIGITS.sub('', query)
+        filter_query = {'search_prefixes': 'p:' + fragment[:MAX_FRAGMENT]}
+        if len(fragment) > MAX_FRAGMENT:
+            # Stored phones keep their formatting, so allow anything between the digits
+            filter_query['phone'] = {'$regex': r'\D*'.join(fragment)}
+        return filter_query
+
+    if len(query) < MIN_FRAGMENT or ' ' in query:
+        raise ValueError(f'Search a single email or phone fragment of at least {MIN_FRAGMENT} characters')
+    filter_query = {'search_prefixes': 'e:' + query[:MAX_FRAGMENT]}
+    if len(query) > MAX_FRAGMENT:
+        filter_query['email'] = {'$regex': re.escape(query), '$options': 'i'}
+    return filter_query
@@ -1,8 +1,104 @@
 from bson import ObjectId
+from bson.errors import InvalidId
 from datetime import datetime
 from app import db
+from app.models.pagination import encode_cursor, before_cursor_filter
+from app.models.search_prefixes import search_prefixes, fragment_filter, is_phone_query
+from app.models.collection_version import CollectionVersion
+from app.services.admin_events import publish_dashboard_delta
+from app.services.status_hooks import transition_hooks, StatusTransition
+from app.middleware.http_cache import make_etag
+from pymongo import IndexModel, ASCENDING, DESCENDING, TEXT, ReturnDocument, UpdateOne
+import time
+
+def dashboard_pipeline(start_of_day, end_of_day):
+    """Today's per-status counts and requests; the $match runs on the created_at index,
+    $facet itself cannot use indexes"""
+    return [
+        {'$match': {'created_at': {'$gte': start_of_day, '$lte': end_of_day}}},
+        {'$facet': {
+            'by_status': [
+                {'$group': {'_id': '$status', 'count': {'$sum': 1}}}
+            ],
+            'recent': [
+                {'$sort': {'created_at': -1}},
+                {'$project': {
+                    '_id': 0,
+                    'id': {'$toString': '$_id'},
+                    'name': 1,
+                    'email': 1,
+                    'service_type': 1,
+                    'status': 1,
+                    'created_at': {'$dateToString': {'date': '$created_at', 'format': '%d/%m/%Y %H:%M'}}
+                }}
+            ]
+        }}
+    ]
+
 
 class ServiceRequest:
+    COLLECTION = 'service_requests'
+    INDEXES = [
+        IndexModel([('created_at', DESCENDING), ('_id', DESCENDING)], name='created_at_id'),
+        IndexModel([('status', ASCENDING), ('created_at', DESCENDING), ('_id', DESCENDING)], name='status_created_at_id'),
+        IndexModel([('read', ASCENDING), ('created_at', DESCENDING)], name='read_created_at'),
+        # Requests come in several languages, some (no) unknown to Mongo text search, so
+        # words are matched as typed; `language` must not be read as the text language
+        IndexModel(
+            [('name', TEXT), ('email', TEXT), ('phone', TEXT), ('address', TEXT), ('message', TEXT)],
+            name='request_text',
+            weights={'name': 10, 'email': 5, 'phone': 5, 'address': 2, 'message': 1},
+            default_language='none',
+            language_override='text_language'
+        ),
+        IndexModel([('search_prefixes', ASCENDING), ('created_at', DESCENDING), ('_id', DESCENDING)], name='search_prefixes_created_at_id')
+    ]
+    # Query shapes checked by `flask check-query-plans`
+    QUERY_SHAPES = [
+        {'name': 'list_requests', 'filter': {}, 'sort': [('created_at', -1), ('_id', -1)]},
+        {'name': 'list_requests_by_status', 'filter': {'status': 'new'}, 'sort': [('created_at', -1), ('_id', -1)]},
+        {'name': 'count_unread_requests', 'filter': {'read': False}},
+        {'name': 'todays_requests', 'filter': {'created_at': {'$gte': datetime(2000, 1, 1)}}, 'sort': [('created_at', -1)]},
+        {'name': 'export_requests', 'filter': {'created_at': {'$gte': datetime(2000, 1, 1), '$lt': datetime(2001, 1, 1)}}, 'sort': [('created_at', -1), ('_id', -1)]},
+        {'name': 'dashboard_stats', 'pipeline': dashboard_pipeline(datetime(2000, 1, 1), datetime(2000, 1, 1, 23, 59, 59))},
+        {'name': 'search_requests_text', 'filter': {'$text': {'$search': 'dupont'}}},
+        {'name': 'search_requests_fragment', 'filter': {'search_prefixes': 'p:470'}, 'sort': [('created_at', -1), ('_id', -1)]}
+    ]
+    # Fields left out of list views, they can be large and are only shown on the detail page
+    LIST_PROJECTION = {'message': 0, 'admin_notes': 0, 'search_prefixes': 0}
+    # search_prefixes only exists for the index, it is never returned
+    DETAIL_PROJECTION = {'search_prefixes': 0}
+    SEARCH_MAX_PER_PAGE = 100
+    # Status -> statuses an admin may move it to; completed and cancelled can only be reopened
+    TRANSITIONS = {
+        'new': {'pending', 'in_progress', 'completed', 'cancelled'},
+        'pending': {'in_progress', 'completed', 'cancelled'},
+        'in_progress': {'pending', 'completed', 'cancelled'},
+        'completed': {'in_progress'},
+        'cancelled': {'pending'}
+    }
+    TRANSITION_TARGETS = ['pending', 'in_progress', 'completed', 'cancelled']
+    # Columns of the admin export, in order; the free-text fields stay out like in list views
+    EXPORT_FIELDS = ['_id', 'name', 'email', 'phone', 'address', 'service_type', 'language',
+                     'status', 'read', 'created_at', 'updated_at']
+    # Documents fetched per round trip while exporting, bounds what is held in memory
+    EXPORT_BATCH_SIZE = 500
+    # Seconds a filtered total is reused before counting again
+    COUNT_CACHE_TTL = 30
+    _count_cache = {}
+    # Seconds a dashboard snapshot is served to repeated admin refreshes
+    DASHBOARD_STATS_TTL = 10
+    _dashboard_snapshot = None
+
+    @staticmethod
+    def id_filter(request_id):
+        """Filter on a request id in either stored form: the API stores str(ObjectId()),
+        older and hand-inserted requests have an ObjectId"""
+        try:
+            return {'_id': {'$in': [str(request_id), ObjectId(request_id)]}}
+        except (InvalidId, TypeError):
+            return {'_id': request_id}
+
     @staticmethod
     def create_request(name, email, phone, address, service_type, message, language='fr'):
         # Create a new service request document
@@ -17,22 +113,42 @@ class ServiceRequest:
             'language': language,  # Add language field
             'status': 'new',
             'read': False,  # Add this field to track if request has been read
+            'search_prefixes': search_prefixes(email, phone),
             'created_at': datetime.now(),
-            'updated_at': datetime.now()
+            # UTC like every later update, it is the request's Last-Modified
+            'updated_at': datetime.utcnow()
         }
         
         # Insert into database
         db.service_requests.insert_one(service_request)
+        CollectionVersion.bump(ServiceRequest.COLLECTION)
         
+        ServiceRequest._dashboard_snapshot = None
+        publish_dashboard_delta(
+            {'totalRequests': 1, 'unreadCount': 1},
+            created={'id': service_request['_id'], 'status': 'new'}
+        )
         return service_request
     # Add a new method to mark requests as read
     @staticmethod
     def mark_as_read(request_id):
+        """True once the request is marked read, False if it already was, None if it does not exist"""
+        # updated_at only moves when read changes, so an already-read request is left untouched
+        # and the delta is sent once per request
         result = db.service_requests.update_one(
-            {'_id': ObjectId(request_id)},
-            {'$set': {'read': True, 'updated_at': datetime.utcnow()}}
+            ServiceRequest.id_filter(request_id),
+            [{'$set': {
+                'updated_at': {'$cond': [{'$eq': ['$read', True]}, '$updated_at', datetime.utcnow()]},
+                'read': True
+            }}]
         )
-        return result.modified_count > 0
+        if result.matched_count == 0:
+            return None
+        if result.modified_count == 0:
+            return False
+        CollectionVersion.bump(ServiceRequest.COLLECTION)
+        publish_dashboard_delta({'unreadCount': -1}, read={'id': str(request_id)})
+        return True
 
     # Add a method to count unread requests
     @staticmethod
@@ -40,10 +156,35 @@ class ServiceRequest:
         return db.service_requests.count_documents({'read': False})
     @staticmethod
     def get_all_requests():
-        requests = list(db.service_requests.find().sort('created_at', -1))
-        for request in requests:
-            request['_id'] = str(request['_id'])
-        return requests
+        return list(db.service_requests.find({}, ServiceRequest.DETAIL_PROJECTION).sort('created_at', -1))
+    
+    @staticmethod
+    def export_filter(status=None, service_type=None, language=None, created_from=None, created_to=None):
+        """Filter for iter_export; created_to is exclusive"""
+        filter_query = {}
+        if status:
+            filter_query['status'] = status
+        if service_type:
+            filter_query['service_type'] = service_type
+        if language:
+            filter_query['language'] = language
+        if created_from or created_to:
+            filter_query['created_at'] = {}
+            if created_from:
+                filter_query['created_at']['$gte'] = created_from
+            if created_to:
+                filter_query['created_at']['$lt'] = created_to
+        return filter_query
+    
+    @staticmethod
+    def iter_export(filter_query):
+        """Matching requests newest first, streamed from the cursor one batch at a time"""
+        projection = {field: 1 for field in ServiceRequest.EXPORT_FIELDS}
+        return (
+            db.service_requests.find(filter_query, projection)
+            .sort([('created_at', -1), ('_id', -1)])
+            .batch_size(ServiceRequest.EXPORT_BATCH_SIZE)
+        )
     
     @staticmethod
     def get_paginated_requests(page=1, per_page=10, status=None):
@@ -58,43 +199,207 @@ class ServiceRequest:
         
         # Get paginated results
         skip = (page - 1) * per_page
-        cursor = db.service_requests.find(filter_query).sort('created_at', -1).skip(skip).limit(per_page)
+        cursor = db.service_requests.find(filter_query, ServiceRequest.LIST_PROJECTION).sort('created_at', -1).skip(skip).limit(per_page)
         
-        # Convert to list and format IDs
-        requests = list(cursor)
-        for request in requests:
-            request['_id'] = str(request['_id'])
+        return list(cursor), total_pages
+    
+    @staticmethod
+    def get_requests_after(cursor=None, per_page=10, status=None):
+        """Keyset pagination on (created_at, _id), newest first"""
+        filter_query = {}
+        if status:
+            filter_query['status'] = status
+        
+        if cursor:
+            filter_query.update(before_cursor_filter(cursor))
+        
+        # Fetch one extra document to know whether another page exists
+        requests = list(
+            db.service_requests.find(filter_query, ServiceRequest.LIST_PROJECTION)
+            .sort([('created_at', -1), ('_id', -1)])
+            .limit(per_page + 1)
+        )
+        next_cursor = None
+        if len(requests) > per_page:
+            requests = requests[:per_page]
+            next_cursor = encode_cursor(requests[-1])
         
-        return requests, total_pages
+        return requests, next_cursor
+    
+    @staticmethod
+    def search_requests(query, mode='auto', status=None, page=1, per_page=20):
+        """Ranked page of matching requests and whether another page exists.
+
+        `text` searches name, email, phone, address and message through the text index,
+        best matches first. `fragment` finds email or phone fragments ("dupont@g", "470 12")
+        through search_prefixes, newest first. `auto` picks fragment for phone-like
+        queries and anything with an @.
+        """
+        query = (query or '').strip()
+        if mode == 'auto':
+            mode = 'fragment' if '@' in query or is_phone_query(query) else 'text'
+        per_page = min(max(per_page, 1), ServiceRequest.SEARCH_MAX_PER_PAGE)
+        skip = (max(page, 1) - 1) * per_page
+        
+        if mode == 'text':
+            if not query:
+                raise ValueError('Search query is required')
+            filter_query = {'$text': {'$search': query}}
+            projection = dict(ServiceRequest.LIST_PROJECTION, score={'$meta': 'textScore'})
+            sort = [('score', {'$meta': 'textScore'}), ('created_at', -1), ('_id', -1)]
+        elif mode == 'fragment':
+            filter_query = fragment_filter(query)
+            projection = ServiceRequest.LIST_PROJECTION
+            sort = [('created_at', -1), ('_id', -1)]
+        else:
+            raise ValueError('mode must be one of: auto, text, fragment')
+        
+        if status:
+            filter_query['status'] = status
+        
+        # One extra document tells whether there is a next page without counting every match
+        requests = list(
+            db.service_requests.find(filter_query, projection)
+            .sort(sort)
+            .skip(skip)
+            .limit(per_page + 1)
+        )
+        return requests[:per_page], len(requests) > per_page, mode
+    
+    @staticmethod
+    def backfill_search_prefixes(batch_size=1000):
+        """Set search_prefixes on requests stored before fragment search existed"""
+        updated = 0
+        while True:
+            # _id is an ObjectId or its string form, so batches cannot be walked by _id;
+            # updated requests simply stop matching the filter
+            batch = list(
+                db.service_requests.find({'search_prefixes': {'$exists': False}}, {'email': 1, 'phone': 1})
+                .limit(batch_size)
+            )
+            if not batch:
+                return updated
+            
+            result = db.service_requests.bulk_write([
+                UpdateOne(
+                    {'_id': request['_id']},
+                    {'$set': {'search_prefixes': search_prefixes(request.get('email'), request.get('phone'))}}
+                )
+                for request in batch
+            ], ordered=False)
+            updated += result.modified_count
+    
+    @staticmethod
+    def estimate_total(status=None):
+        """Approximate total for list headers without counting on every page view"""
+        if not status:
+            # Served from collection metadata, no scan
+            return db.service_requests.estimated_document_count()
+        
+        cached = ServiceRequest._count_cache.get(status)
+        now = time.monotonic()
+        if cached and now - cached[1] < ServiceRequest.COUNT_CACHE_TTL:
+            return cached[0]
+        
+        total = db.service_requests.count_documents({'status': status})
+        ServiceRequest._count_cache[status] = (total, now)
+        return total
     
     @staticmethod
     def get_request_by_id(request_id):
-        request = db.service_requests.find_one({'_id': ObjectId(request_id)})
-        if request:
-            request['_id'] = str(request['_id'])
-        return request
+        return db.service_requests.find_one(ServiceRequest.id_filter(request_id), ServiceRequest.DETAIL_PROJECTION)
+    
+    @staticmethod
+    def get_validators(request_id):
+        """(etag, last_modified) of one request from its updated_at, None if it does not exist"""
+        request = db.service_requests.find_one(ServiceRequest.id_filter(request_id), {'updated_at': 1})
+        if not request or not request.get('updated_at'):
+            return None
+        return make_etag(request['_id'], request['updated_at'].isoformat()), request['updated_at']
+    
+    @staticmethod
+    def get_list_validators(*query):
+        """(etag, last_modified) of any listing, from the collection version and the query"""
+        version, updated_at = CollectionVersion.get(ServiceRequest.COLLECTION)
+        return make_etag(version, *query), updated_at
     
     @staticmethod
     def update_request_status(request_id, status):
-        result = db.service_requests.update_one(
-            {'_id': ObjectId(request_id)},
-            {'$set': {'status': status, 'updated_at': datetime.utcnow()}}
-        )
-        return result.modified_count > 0
+        try:
+            return ServiceRequest.transition_status(request_id, status) is not None
+        except ValueError:
+            return False
     
     @staticmethod
-    def update_request(request_id, status, admin_notes=None):
-        update_data = {
+    def transition_status(request_id, status, admin_notes=None):
+        """Move a request to `status` in one write and return the updated document.
+
+        The transition is checked by the write itself: it only matches a request whose
+        current status may move to `status`. Keeping the same status (to edit the notes)
+        is always allowed and runs no hooks. Returns None if the request does not exist,
+        raises ValueError if the transition is not allowed.
+        """
+        if status not in ServiceRequest.TRANSITION_TARGETS:
+            raise ValueError(f"Unknown status: {status}")
+        sources = [source for source, targets in ServiceRequest.TRANSITIONS.items() if status in targets]
+        
+        # Millisecond precision, as stored, so the returned value can be compared with it
+        now = datetime.utcnow()
+        now = now.replace(microsecond=now.microsecond // 1000 * 1000)
+        unchanged = {'$eq': ['$status', status]}
+        update = {
+            'previous_status': {'$cond': [unchanged, '$previous_status', '$status']},
+            'status_changed_at': {'$cond': [unchanged, '$status_changed_at', now]},
             'status': status,
-            'updated_at': datetime.utcnow()
+            'updated_at': now
         }
-        
-        # Add admin_notes to update if provided
         if admin_notes is not None:
-            update_data['admin_notes'] = admin_notes
+            # Notes are text, never an expression
+            update['admin_notes'] = {'$literal': admin_notes}
         
-        result = db.service_requests.update_one(
-            {'_id': ObjectId(request_id)},
-            {'$set': update_data}
+        request = db.service_requests.find_one_and_update(
+            {**ServiceRequest.id_filter(request_id), 'status': {'$in': sources + [status]}},
+            [{'$set': update}],
+            projection=ServiceRequest.DETAIL_PROJECTION,
+            return_document=ReturnDocument.AFTER
         )
-        return result.modified_count > 0
\ No newline at end of file
+        if request is None:
+            # Only a rejected write pays for this read
+            current = db.service_requests.find_one(ServiceRequest.id_filter(request_id), {'status': 1})
+            if current is None:
+                return None
+            raise ValueError(f"A {current.get('status')} request cannot be moved to {status}")
+        CollectionVersion.bump(ServiceRequest.COLLECTION)
+        
+        if request.get('status_changed_at') == now:
+            ServiceRequest._dashboard_snapshot = None
+            transition_hooks.dispatch(StatusTransition(request, request.get('previous_status'), status))
+        return request
+    
+    @staticmethod
+    def get_dashboard_stats(fresh=False):
+        """All-time total, plus today's per-status counts and requests in one aggregation"""
+        today = datetime.now()
+        start_of_day = datetime(today.year, today.month, today.day, 0, 0, 0)
+        end_of_day = datetime(today.year, today.month, today.day, 23, 59, 59)
+        
+        snapshot = ServiceRequest._dashboard_snapshot
+        if (not fresh and snapshot and snapshot['day'] == start_of_day
+                and time.monotonic() - snapshot['taken_at'] < ServiceRequest.DASHBOARD_STATS_TTL):
+            return snapshot['stats']
+        
+        result = next(db.service_requests.aggregate(dashboard_pipeline(start_of_day, end_of_day)))
+        
+        by_status = {group['_id']: group['count'] for group in result['by_status']}
+        stats = {
+            # Served from collection metadata, no scan
+            'totalRequests': db.service_requests.estimated_document_count(),
+            'pendingRequests': by_status.get('pending', 0),
+            'inProgressRequests': by_status.get('in_progress', 0),
+            'completedRequests': by_status.get('completed', 0),
+            'cancelledRequests': by_status.get('cancelled', 0),
+            'recentRequests': result['recent']
+        }
+        
+        ServiceRequest._dashboard_snapshot = {'day': start_of_day, 'taken_at': time.monotonic(), 'stats': stats}
+        return stats
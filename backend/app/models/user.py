@@ -1,12 +1,42 @@
 from app import db
-from passlib.hash import pbkdf2_sha256
+from app.services.password_hasher import password_hasher
+from app.models.login_session import LoginSession
+from app.services.principal_cache import principal_cache
 from datetime import datetime, timedelta
 import re
 import secrets
 import pyotp
 from bson.objectid import ObjectId
+from pymongo import IndexModel, ASCENDING, ReturnDocument
 
 class User:
+    COLLECTION = 'users'
+    INDEXES = [
+        IndexModel([('email', ASCENDING)], name='email_unique', unique=True)
+    ]
+    # Query shapes checked by `flask check-query-plans`
+    QUERY_SHAPES = [
+        {'name': 'get_user_by_email', 'filter': {'email': 'user@example.com'}}
+    ]
+    # Named projections, one per access pattern; None fetches the whole document
+    PROJECTIONS = {
+        'exists': {'_id': 1},
+        'login': {
+            'email': 1, 'password': 1, 'role': 1, 'is_active': 1,
+            'first_name': 1, 'last_name': 1,
+            'failed_login_attempts': 1, 'account_locked_until': 1
+        },
+        'two_factor': {'two_factor_enabled': 1, 'totp_secret': 1},
+        # What JWT-protected endpoints check, cached by get_principal
+        'principal': {
+            'email': 1, 'role': 1, 'is_active': 1, 'first_name': 1, 'last_name': 1,
+            'two_factor_enabled': 1, 'last_login': 1, 'created_at': 1
+        }
+    }
+    # Lock the account for LOCKOUT_DURATION after this many failed logins
+    MAX_FAILED_LOGINS = 5
+    LOCKOUT_DURATION = timedelta(minutes=30)
+
     @staticmethod
     def validate_email(email):
         """Enhanced email validation"""
@@ -49,7 +79,7 @@ class User:
         if not is_valid:
             raise ValueError(message)
         
-        if User.get_user_by_email(email):
+        if User.get_user_by_email(email, projection='exists'):
             raise ValueError("User with this email already exists")
         
         # Generate 2FA secret
@@ -57,7 +87,7 @@ class User:
         
         user = {
             'email': email.lower().strip(),
-            'password': pbkdf2_sha256.hash(password),
+            'password': password_hasher.hash(password),
             'role': role,
             'first_name': first_name,
             'last_name': last_name,
@@ -70,7 +100,6 @@ class User:
             'failed_login_attempts': 0,
             'account_locked_until': None,
             'password_changed_at': datetime.utcnow(),
-            'login_sessions': [],
             'security_questions': [],
             'created_at': datetime.utcnow(),
             'updated_at': datetime.utcnow()
@@ -95,11 +124,24 @@ class User:
                 'updated_at': datetime.utcnow()
             }}
         )
+        principal_cache.invalidate(user_id)
+    
+    @staticmethod
+    def set_active(user_id, is_active):
+        """Activate or deactivate an account"""
+        db.users.update_one(
+            {'_id': ObjectId(user_id)},
+            {'$set': {
+                'is_active': is_active,
+                'updated_at': datetime.utcnow()
+            }}
+        )
+        principal_cache.invalidate(user_id)
     
     @staticmethod
     def verify_totp(user_id, token):
         """Verify TOTP token"""
-        user = User.get_user_by_id(user_id)
+        user = User.get_user_by_id(user_id, projection='two_factor')
         if not user or not user.get('two_factor_enabled'):
             return False
         
@@ -109,109 +151,138 @@ class User:
     @staticmethod
     def use_backup_code(user_id, code):
         """Use backup code for 2FA"""
-        user = User.get_user_by_id(user_id)
-        if not user or code not in user.get('backup_codes', []):
-            return False
-        
-        # Remove used backup code
-        backup_codes = user['backup_codes']
-        backup_codes.remove(code)
-        
-        db.users.update_one(
-            {'_id': ObjectId(user_id)},
-            {'$set': {
-                'backup_codes': backup_codes,
-                'updated_at': datetime.utcnow()
-            }}
+        # Remove the used backup code only if the user still has it, without reading the list
+        result = db.users.update_one(
+            {'_id': ObjectId(user_id), 'backup_codes': code},
+            {
+                '$pull': {'backup_codes': code},
+                '$set': {'updated_at': datetime.utcnow()}
+            }
         )
-        return True
+        return result.modified_count > 0
     
     @staticmethod
     def add_login_session(user_id, session_data):
-        """Track user login sessions"""
-        db.users.update_one(
-            {'_id': ObjectId(user_id)},
-            {'$push': {
-                'login_sessions': {
-                    'session_id': session_data['session_id'],
-                    'ip_address': session_data['ip_address'],
-                    'user_agent': session_data['user_agent'],
-                    'login_time': datetime.utcnow(),
-                    'last_activity': datetime.utcnow()
-                }
-            }}
-        )
+        """Track user login sessions in the login_sessions collection"""
+        LoginSession.create(user_id, session_data)
+    
+    @staticmethod
+    def get_user_by_email(email, projection=None):
+        return db.users.find_one({'email': email.lower().strip()}, User.PROJECTIONS.get(projection))
     
     @staticmethod
-    def get_user_by_email(email):
-        return db.users.find_one({'email': email.lower().strip()})
+    def get_principal(user_id):
+        """Role, status and profile fields, served from the principal cache"""
+        return principal_cache.get(user_id, lambda uid: User.get_user_by_id(uid, projection='principal'))
     
     @staticmethod
-    def get_user_by_id(user_id):
+    def get_user_by_id(user_id, projection=None):
         try:
-            return db.users.find_one({'_id': ObjectId(user_id)})
+            return db.users.find_one({'_id': ObjectId(user_id)}, User.PROJECTIONS.get(projection))
         except:
             return None
     
     @staticmethod
     def verify_password(stored_password, provided_password):
-        return pbkdf2_sha256.verify(provided_password, stored_password)
+        return password_hasher.verify(provided_password, stored_password)
     
     @staticmethod
-    def is_account_locked(email):
-        """Check if account is locked due to failed login attempts"""
-        user = User.get_user_by_email(email)
+    def authenticate(email, password):
+        """Login state machine: one read, then at most one conditional write.
+        
+        Returns (outcome, user) where outcome is 'ok', 'invalid', 'locked' or 'inactive'.
+        An expired lock needs no write of its own, the next failure or success resets it.
+        """
+        now = datetime.utcnow()
+        user = User.get_user_by_email(email, projection='login')
         if not user:
-            return False
+            return 'invalid', None
         
-        account_locked_until = user.get('account_locked_until')
-        if account_locked_until and datetime.utcnow() < account_locked_until:
-            return True
+        locked_until = user.get('account_locked_until')
+        if locked_until and now < locked_until:
+            return 'locked', user
         
-        # If lock period has expired, reset failed attempts
-        if account_locked_until and datetime.utcnow() >= account_locked_until:
-            db.users.update_one(
-                {'email': email.lower().strip()},
-                {'$set': {
-                    'failed_login_attempts': 0,
-                    'account_locked_until': None,
-                    'updated_at': datetime.utcnow()
-                }}
-            )
+        if not User.verify_password(user['password'], password):
+            return User.record_failed_login(user['_id'], now), user
         
-        return False
+        if not user.get('is_active', True):
+            return 'inactive', user
+        
+        # Upgrade the stored hash in the same write when the configured rounds changed
+        new_hash = password_hasher.hash(password) if password_hasher.needs_update(user['password']) else None
+        if not User.update_last_login(user['_id'], password_hash=new_hash, now=now):
+            # Parallel failures locked the account after it was read
+            return 'locked', user
+        return 'ok', user
     
     @staticmethod
-    def increment_failed_login(email):
-        """Increment failed login attempts and lock account if necessary"""
-        user = User.get_user_by_email(email)
-        if not user:
-            return
+    def unlocked_filter(user_id, now):
+        """Matches the user only while unlocked, or once the lock has expired"""
+        return {
+            '_id': ObjectId(user_id),
+            '$or': [
+                {'account_locked_until': None},
+                {'account_locked_until': {'$lte': now}}
+            ]
+        }
+    
+    @staticmethod
+    def record_failed_login(user_id, now=None):
+        """Count a failed attempt atomically, locking the account at MAX_FAILED_LOGINS"""
+        now = now or datetime.utcnow()
+        # A date sorts above null/missing, so this only holds for a lock that has run out
+        lock_expired = {'$and': [
+            {'$gt': ['$account_locked_until', None]},
+            {'$lte': ['$account_locked_until', now]}
+        ]}
         
-        failed_attempts = user.get('failed_login_attempts', 0) + 1
+        # Only matches while the account is unlocked (or its lock has expired), so parallel
+        # attempts cannot push the counter past a lock another attempt has just set.
+        updated = db.users.find_one_and_update(
+            User.unlocked_filter(user_id, now),
+            [
+                {'$set': {
+                    'failed_login_attempts': {'$add': [
+                        {'$cond': [lock_expired, 0, {'$ifNull': ['$failed_login_attempts', 0]}]},
+                        1
+                    ]},
+                    'account_locked_until': {'$cond': [lock_expired, None, '$account_locked_until']},
+                    'updated_at': now
+                }},
+                {'$set': {
+                    'account_locked_until': {'$cond': [
+                        {'$gte': ['$failed_login_attempts', User.MAX_FAILED_LOGINS]},
+                        now + User.LOCKOUT_DURATION,
+                        '$account_locked_until'
+                    ]}
+                }}
+            ],
+            projection={'failed_login_attempts': 1},
+            return_document=ReturnDocument.AFTER
+        )
+        if updated is None:
+            return 'locked'
+        return 'invalid'
+    
+    @staticmethod
+    def update_last_login(user_id, password_hash=None, now=None):
+        """Record a successful login and reset failed attempts; False if the account is locked"""
+        now = now or datetime.utcnow()
         update_data = {
-            'failed_login_attempts': failed_attempts,
-            'updated_at': datetime.utcnow()
+            'last_login': now,
+            'failed_login_attempts': 0,
+            'account_locked_until': None,
+            'updated_at': now
         }
+        if password_hash:
+            update_data['password'] = password_hash
         
-        # Lock account after 5 failed attempts for 30 minutes
-        if failed_attempts >= 5:
-            update_data['account_locked_until'] = datetime.utcnow() + timedelta(minutes=30)
-        
-        db.users.update_one(
-            {'email': email.lower().strip()},
+        # Same condition as record_failed_login, a lock set since the read is never undone
+        result = db.users.update_one(
+            User.unlocked_filter(user_id, now),
             {'$set': update_data}
         )
-    
-    @staticmethod
-    def update_last_login(user_id):
-        """Update user's last login time and reset failed attempts"""
-        db.users.update_one(
-            {'_id': ObjectId(user_id)},
-            {'$set': {
-                'last_login': datetime.utcnow(),
-                'failed_login_attempts': 0,
-                'account_locked_until': None,
-                'updated_at': datetime.utcnow()
-            }}
-        )
\ No newline at end of file
+        if result.matched_count == 0:
+            return False
+        principal_cache.invalidate(user_id)
+        return True
@@ -1,8 +1,18 @@
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, Response, jsonify, request
 from app.models.service_request import ServiceRequest
-from flask_jwt_extended import jwt_required, get_jwt
+from app.services.notification_service import email_dispatcher
+from app.middleware.rate_limiter import rate_limit_storage
+from app.services.principal_cache import principal_cache
+from app.services.admin_events import ADMIN_NAMESPACE, ADMIN_ROOM
+from app.services.emit_scheduler import emit_scheduler
+from app.services.presence import presence
+from app.services.status_hooks import transition_hooks
+from app.services.request_export import EXPORT_FORMATS, export_chunks, export_filename, parse_export_date
+from app import socketio
+from flask_jwt_extended import jwt_required, get_jwt, decode_token
+from flask_socketio import emit
+from app.middleware.http_cache import conditional
 from functools import wraps
-import datetime
 
 bp = Blueprint('admin', __name__, url_prefix='/api/admin')
 
@@ -19,12 +29,36 @@ def admin_required():
         return decorator
     return wrapper
 
+def requests_list_validators():
+    # Every write to service_requests bumps the version, the query picks the page
+    return ServiceRequest.get_list_validators(sorted(request.args.items(multi=True)))
+
 @bp.route('/requests', methods=['GET'])
 @admin_required()
+@conditional(requests_list_validators)
 def get_all_requests():
     page = request.args.get('page', 1, type=int)
     status = request.args.get('status')
     
+    # Cursor mode: pass ?cursor= (empty for the first page) and follow next_cursor
+    if 'cursor' in request.args:
+        per_page = min(max(request.args.get('per_page', 10, type=int), 1), 100)
+        try:
+            requests, next_cursor = ServiceRequest.get_requests_after(
+                cursor=request.args.get('cursor'),
+                per_page=per_page,
+                status=status
+            )
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        return jsonify({
+            'requests': requests,
+            'next_cursor': next_cursor,
+            'total': ServiceRequest.estimate_total(status),
+            'total_is_estimate': True
+        }), 200
+    
     # Get paginated requests
     requests, total_pages = ServiceRequest.get_paginated_requests(page=page, status=status)
     
@@ -33,8 +67,68 @@ def get_all_requests():
         'total_pages': total_pages
     }), 200
 
+@bp.route('/requests/search', methods=['GET'])
+@admin_required()
+@conditional(requests_list_validators)
+def search_requests():
+    # ?q= with optional mode (auto, text, fragment), status, page and per_page
+    page = request.args.get('page', 1, type=int)
+    per_page = request.args.get('per_page', 20, type=int)
+    try:
+        requests, has_more, mode = ServiceRequest.search_requests(
+            request.args.get('q', ''),
+            mode=request.args.get('mode', 'auto'),
+            status=request.args.get('status'),
+            page=page,
+            per_page=per_page
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    return jsonify({
+        'requests': requests,
+        'page': page,
+        'has_more': has_more,
+        'mode': mode
+    }), 200
+
+@bp.route('/requests/export', methods=['GET'])
+@admin_required()
+def export_requests():
+    # ?format=csv|ndjson, filters as query parameters, ?compress=gzip for a .gz download
+    export_format = request.args.get('format', 'csv')
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({'error': f'format must be one of: {list(EXPORT_FORMATS)}'}), 400
+    compress = request.args.get('compress') == 'gzip'
+    
+    try:
+        created_from = parse_export_date(request.args.get('from'))
+        created_to = parse_export_date(request.args.get('to'), end=True)
+    except ValueError:
+        return jsonify({'error': 'from and to must be ISO 8601 dates'}), 400
+    
+    documents = ServiceRequest.iter_export(ServiceRequest.export_filter(
+        status=request.args.get('status'),
+        service_type=request.args.get('service_type'),
+        language=request.args.get('language'),
+        created_from=created_from,
+        created_to=created_to
+    ))
+    
+    # The body is generated while it is sent, one cursor batch in memory at a time
+    response = Response(
+        export_chunks(documents, ServiceRequest.EXPORT_FIELDS, export_format, compress=compress),
+        mimetype='application/gzip' if compress else EXPORT_FORMATS[export_format][0]
+    )
+    response.headers['Content-Disposition'] = f'attachment; filename="{export_filename(export_format, compress)}"'
+    response.headers['Cache-Control'] = 'no-store'
+    # Stops nginx from buffering the whole export before passing it on
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
 @bp.route('/requests/<request_id>', methods=['GET'])
 @admin_required()
+@conditional(ServiceRequest.get_validators)
 def get_request(request_id):
     request = ServiceRequest.get_request_by_id(request_id)
     if not request:
@@ -44,9 +138,9 @@ def get_request(request_id):
 @bp.route('/requests/<request_id>/read', methods=['PUT'])
 @admin_required()
 def mark_request_as_read(request_id):
-    success = ServiceRequest.mark_as_read(request_id)
-    if not success:
-        return jsonify({'error': 'Failed to mark request as read'}), 500
+    # Opening a request that was already read is fine, there is just nothing to change
+    if ServiceRequest.mark_as_read(request_id) is None:
+        return jsonify({'error': 'Request not found'}), 404
     return jsonify({'message': 'Request marked as read'}), 200
 
 @bp.route('/requests/unread-count', methods=['GET'])
@@ -62,162 +156,59 @@ def update_request_status(request_id):
     if not data or 'status' not in data:
         return jsonify({'error': 'Status is required'}), 400
     
-    valid_statuses = ['pending', 'in_progress', 'completed', 'cancelled']
+    valid_statuses = ServiceRequest.TRANSITION_TARGETS
     if data['status'] not in valid_statuses:
         return jsonify({'error': f'Status must be one of: {valid_statuses}'}), 400
     
-    # Get admin notes if provided
-    admin_notes = data.get('admin_notes')
-    
-    # Get the service request to access user email
-    service_request = ServiceRequest.get_request_by_id(request_id)
+    # One write; customer emails and admin events run from the status hooks afterwards
+    try:
+        service_request = ServiceRequest.transition_status(request_id, data['status'], data.get('admin_notes'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 409
     if not service_request:
         return jsonify({'error': 'Request not found'}), 404
     
-    # Update request status and notes
-    success = ServiceRequest.update_request(request_id, data['status'], admin_notes)
-    if not success:
-        return jsonify({'error': 'Failed to update request'}), 500
-    
-    # Send thank-you email if status is changed to completed
-    if data['status'] == 'completed':
-        # Get service type name for emails
-        service_types = {
-            'vide_maison': 'Vide Maison',
-            'vide_appartement': 'Vide Appartement',
-            'vide_grenier': 'Vide Grenier',
-            'vide_locaux': 'Vide Locaux Professionnels',
-            'vide_bureau': 'Vide Bureau',
-            'nettoyage': 'Nettoyage'
-        }
-        service_type_name = service_types.get(service_request['service_type'], service_request['service_type'])
-        
-        # Send thank-you email if status is changed to completed
-    if data['status'] == 'completed':
-        # Get the service request to access user details
-        req = ServiceRequest.get_request_by_id(request_id)
-        if req:
-            status_email = f"""
-            <html>
-                <body style="font-family: Arial, sans-serif; background-color: #f4f4f4; padding: 20px;">
-                    <div style="max-width: 600px; margin: 0 auto; background-color: white; border-radius: 10px; padding: 30px;">
-                        <h2 style="color: #4caf50; text-align: center;">✅ Service Terminé!</h2>
-                        <p style="color: #666;">Cher(e) {req['name']},</p>
-                        <p style="color: #666;">
-                            Nous sommes heureux de vous informer que votre service de débarras à <strong>{req['address']}</strong> a été complété avec succès.
-                        </p>
-                        <p style="color: #666;">
-                            Merci d'avoir choisi Elite Clearance. Nous espérons que notre service a répondu à vos attentes!
-                        </p>
-                        <p style="color: #666;">
-                            Cordialement,<br>
-                            <strong>L'équipe Elite Clearance</strong>
-                        </p>
-                    </div>
-                </body>
-            </html>
-            """
-            
-            from app.services.notification_service import send_email_notification
-            send_email_notification(
-                'Service Terminé - Elite Clearance',
-                '',  # Empty body since we're using HTML
-                req['email'],
-                html=status_email
-            )
-    
-    # Send cancellation email if status is changed to cancelled
-    elif data['status'] == 'cancelled':
-        # Get the service request to access user details
-        req = ServiceRequest.get_request_by_id(request_id)
-        if req:
-            # Get cancellation reason from admin notes
-            cancellation_reason = req['admin_notes'] if req['admin_notes'] else 'Raison non spécifiée'
-            
-            status_email = f"""
-            <html>
-                <body style="font-family: Arial, sans-serif; background-color: #f4f4f4; padding: 20px;">
-                    <div style="max-width: 600px; margin: 0 auto; background-color: white; border-radius: 10px; padding: 30px;">
-                        <h2 style="color: #e74c3c; text-align: center;">❌ Service Annulé</h2>
-                        <p style="color: #666;">Cher(e) {req['name']},</p>
-                        <p style="color: #666;">
-                            Nous regretons de vous informer que votre demande de service à <strong>{req['address']}</strong> a été annulée.
-                        </p>
-                        <p style="color: #666;">
-                            <strong>Raison de l'annulation:</strong> {cancellation_reason}
-                        </p>
-                        <p style="color: #666;">
-                            Si vous avez des questions concernant cette annulation, n'hésitez pas à nous contacter.
-                        </p>
-                        <p style="color: #666;">
-                            Cordialement,<br>
-                            <strong>L'équipe Elite Clearance</strong>
-                        </p>
-                    </div>
-                </body>
-            </html>
-            """
-            
-            from app.services.notification_service import send_email_notification
-            send_email_notification(
-                'Service Annulé - Elite Clearance',
-                '',  # Empty body since we're using HTML
-                req['email'],
-                html=status_email
-            )
-    
-    return jsonify({'message': 'Request updated successfully'}), 200
+    return jsonify({'message': 'Request updated successfully', 'request': service_request}), 200
+
+
+@bp.route('/metrics', methods=['GET'])
+@admin_required()
+def get_metrics():
+    # Per-process counters, each worker reports its own
+    return jsonify({
+        'rate_limiter': rate_limit_storage.stats(),
+        'email': dict(email_dispatcher.stats),
+        'principal_cache': principal_cache.stats(),
+        'socketio_emits': emit_scheduler.stats(),
+        'presence': presence.stats(),
+        'status_hooks': transition_hooks.stats()
+    }), 200
 
 
 @bp.route('/dashboard/stats', methods=['GET'])
 @admin_required()
 def get_dashboard_stats():
-    # Get today's date range
-    today = datetime.datetime.now()
-    start_of_day = datetime.datetime(today.year, today.month, today.day, 0, 0, 0)
-    end_of_day = datetime.datetime(today.year, today.month, today.day, 23, 59, 59)
-    
-    # Get counts for different statuses (all-time)
-    total_requests = db.service_requests.count_documents({})
-    
-    # Get counts for today only
-    today_filter = {
-        'created_at': {
-            '$gte': start_of_day,
-            '$lte': end_of_day
-        }
-    }
-    
-    # Today's counts by status
-    pending_requests = db.service_requests.count_documents({**today_filter, 'status': 'pending'})
-    in_progress_requests = db.service_requests.count_documents({**today_filter, 'status': 'in_progress'})
-    completed_requests = db.service_requests.count_documents({**today_filter, 'status': 'completed'})
-    cancelled_requests = db.service_requests.count_documents({**today_filter, 'status': 'cancelled'})
-    
-    # Get today's requests instead of just recent requests
-    todays_requests_cursor = db.service_requests.find(today_filter).sort('created_at', -1)
-    
-    recent_requests = []
-    
-    for req in todays_requests_cursor:
-        req['_id'] = str(req['_id'])
-        # Format date for display
-        req['created_at_formatted'] = req['created_at'].strftime('%d/%m/%Y %H:%M')
+    # Served from a short-lived snapshot unless ?fresh=true is passed
+    fresh = request.args.get('fresh', 'false').lower() in ['true', '1', 't']
+    return jsonify(ServiceRequest.get_dashboard_stats(fresh=fresh)), 200
 
-        recent_requests.append({
-            'id': req['_id'],
-            'name': req['name'],
-            'email': req['email'],
-            'service_type': req['service_type'],
-            'status': req['status'],
-            'created_at': req['created_at_formatted']
-        })
-    
-    return jsonify({
-        'totalRequests': total_requests,
-        'pendingRequests': pending_requests,
-        'inProgressRequests': in_progress_requests,
-        'completedRequests': completed_requests,
-        'cancelledRequests': cancelled_requests,
-        'recentRequests': recent_requests
-    }), 200
\ No newline at end of file
+
+@socketio.on('connect', namespace=ADMIN_NAMESPACE)
+def handle_admin_connect(auth=None):
+    # Only admins may join; the token comes from the client's `auth` payload
+    token = (auth or {}).get('token') or request.args.get('token')
+    try:
+        claims = decode_token(token) if token else {}
+    except Exception:
+        claims = {}
+    if claims.get('role') != 'admin':
+        return False
+    
+    # Clients that handle event_batch say so with {batch: true} in auth
+    emit_scheduler.join(ADMIN_ROOM, batching=bool((auth or {}).get('batch')))
+    
+    # Full state once, dashboard_delta events keep it current from here on
+    emit('dashboard_snapshot', {
+        'unreadCount': ServiceRequest.count_unread_requests(),
+        'stats': ServiceRequest.get_dashboard_stats()
+    })
@@ -1,10 +1,12 @@
 from flask import Blueprint, request, jsonify, current_app
 from app.models.user import User
-from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity, create_refresh_token
+from app.models.login_session import activity_buffer
+from app.middleware.rate_limiter import rate_limit_storage
+from app.services.password_hasher import HashingBusyError
+from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity, get_jwt, create_refresh_token, decode_token
 from datetime import timedelta
 import logging
 from functools import wraps
-import time
 
 bp = Blueprint('auth', __name__, url_prefix='/api/auth')
 
@@ -13,26 +15,11 @@ def rate_limit(max_requests=5, window=60):
     def decorator(f):
         @wraps(f)
         def decorated_function(*args, **kwargs):
-            # Simple in-memory rate limiting (use Redis in production)
-            client_ip = request.remote_addr
-            current_time = time.time()
-            
-            if not hasattr(current_app, 'rate_limit_storage'):
-                current_app.rate_limit_storage = {}
-            
-            if client_ip not in current_app.rate_limit_storage:
-                current_app.rate_limit_storage[client_ip] = []
-            
-            # Clean old requests
-            current_app.rate_limit_storage[client_ip] = [
-                req_time for req_time in current_app.rate_limit_storage[client_ip]
-                if current_time - req_time < window
-            ]
-            
-            if len(current_app.rate_limit_storage[client_ip]) >= max_requests:
+            # Counted in the shared storage so the limit holds across workers
+            key = f"auth:{f.__name__}:{request.remote_addr}"
+            if not rate_limit_storage.hit(key, max_requests, window).allowed:
                 return jsonify({'error': 'Too many requests. Please try again later.'}), 429
             
-            current_app.rate_limit_storage[client_ip].append(current_time)
             return f(*args, **kwargs)
         return decorated_function
     return decorator
@@ -73,6 +60,8 @@ def register():
         
     except ValueError as e:
         return jsonify({'error': str(e)}), 400
+    except HashingBusyError:
+        return jsonify({'error': 'Server is busy. Please try again shortly.'}), 503, {'Retry-After': '5'}
     except Exception as e:
         logging.error(f"Registration error: {str(e)}")
         return jsonify({'error': 'Registration failed'}), 500
@@ -89,24 +78,19 @@ def login():
         
         email = data['email'].lower().strip()
         
-        # Check if account is locked
-        if User.is_account_locked(email):
+        # Lock check, password check and counter updates in one read and one write
+        outcome, user = User.authenticate(email, data['password'])
+        
+        if outcome == 'locked':
             return jsonify({'error': 'Account is temporarily locked due to multiple failed login attempts'}), 423
         
-        # Check if user exists
-        user = User.get_user_by_email(email)
-        if not user or not User.verify_password(user['password'], data['password']):
-            User.increment_failed_login(email)
+        if outcome == 'invalid':
             logging.warning(f"Failed login attempt for: {email}")
             return jsonify({'error': 'Invalid credentials'}), 401
         
-        # Check if account is active
-        if not user.get('is_active', True):
+        if outcome == 'inactive':
             return jsonify({'error': 'Account is deactivated'}), 403
         
-        # Update last login
-        User.update_last_login(user['_id'])
-        
         # Create tokens
         access_token = create_access_token(
             identity=str(user['_id']),
@@ -119,13 +103,20 @@ def login():
             expires_delta=timedelta(days=30)
         )
         
+        # One session per refresh token, identified by its jti
+        User.add_login_session(user['_id'], {
+            'session_id': decode_token(refresh_token)['jti'],
+            'ip_address': request.remote_addr,
+            'user_agent': request.headers.get('User-Agent')
+        })
+        
         logging.info(f"Successful login: {user['email']}")
         
         return jsonify({
             'access_token': access_token,
             'refresh_token': refresh_token,
             'user': {
-                'id': str(user['_id']),
+                'id': user['_id'],
                 'email': user['email'],
                 'role': user['role'],
                 'first_name': user.get('first_name'),
@@ -133,6 +124,8 @@ def login():
             }
         }), 200
         
+    except HashingBusyError:
+        return jsonify({'error': 'Server is busy. Please try again shortly.'}), 503, {'Retry-After': '5'}
     except Exception as e:
         logging.error(f"Login error: {str(e)}")
         return jsonify({'error': 'Login failed'}), 500
@@ -142,7 +135,7 @@ def login():
 def refresh():
     try:
         current_user_id = get_jwt_identity()
-        user = User.get_user_by_id(current_user_id)
+        user = User.get_principal(current_user_id)
         
         if not user or not user.get('is_active', True):
             return jsonify({'error': 'User not found or inactive'}), 404
@@ -153,6 +146,9 @@ def refresh():
             expires_delta=timedelta(hours=1)
         )
         
+        # Buffered, written with the other sessions' activity at the next flush
+        activity_buffer.touch(current_user_id, get_jwt()['jti'])
+        
         return jsonify({'access_token': new_token}), 200
         
     except Exception as e:
@@ -164,13 +160,13 @@ def refresh():
 def get_profile():
     try:
         current_user_id = get_jwt_identity()
-        user = User.get_user_by_id(current_user_id)
+        user = User.get_principal(current_user_id)
         
         if not user:
             return jsonify({'error': 'User not found'}), 404
         
         return jsonify({
-            'id': str(user['_id']),
+            'id': user['_id'],
             'email': user['email'],
             'role': user['role'],
             'first_name': user.get('first_name'),
@@ -1,8 +1,13 @@
 from flask import Blueprint, request, jsonify
 from app.models.chat import Chat
-from flask_jwt_extended import jwt_required, get_jwt_identity
-from app import socketio 
-from flask_socketio import join_room 
+from app.models.pagination import encode_cursor
+from flask_jwt_extended import jwt_required, get_jwt_identity, decode_token
+from app import socketio
+from app.services.emit_scheduler import emit_scheduler
+from app.services.presence import presence
+from flask_socketio import emit
+from datetime import datetime, timezone
+import time
 
 bp = Blueprint('chat', __name__, url_prefix='/api/chat')
 
@@ -24,14 +29,7 @@ def send_message(receiver_id):
         message_type=message_type
     )
     
-    # Emit message to receiver
-    socketio.emit('new_message', {
-        'id': message['_id'],
-        'sender_id': message['sender_id'],
-        'content': message['content'],
-        'message_type': message['message_type'],
-        'created_at': message['created_at'].isoformat()
-    }, room=receiver_id)
+    deliver_message(message)
     
     return jsonify({
         'id': message['_id'],
@@ -39,16 +37,28 @@ def send_message(receiver_id):
         'receiver_id': message['receiver_id'],
         'content': message['content'],
         'message_type': message['message_type'],
-        'created_at': message['created_at'].isoformat()
+        'created_at': message['created_at']
     }), 201
 
 @bp.route('/messages/<user_id>', methods=['GET'])
 @jwt_required()
 def get_conversation(user_id):
     current_user_id = get_jwt_identity()
-    messages = Chat.get_conversation(current_user_id, user_id)
+    try:
+        messages, next_before = Chat.get_conversation(
+            current_user_id,
+            user_id,
+            before=request.args.get('before'),
+            limit=request.args.get('limit', 50, type=int)
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     
-    return jsonify(messages), 200
+    # Pass next_before back as ?before= to load older messages
+    return jsonify({
+        'messages': messages,
+        'next_before': next_before
+    }), 200
 
 @bp.route('/messages/<message_id>/read', methods=['PUT'])
 @jwt_required()
@@ -59,18 +69,187 @@ def mark_as_read(message_id):
     
     return jsonify({'message': 'Message marked as read'}), 200
 
+@bp.route('/conversations/<user_id>/read', methods=['PUT'])
+@jwt_required()
+def mark_conversation_read(user_id):
+    current_user_id = get_jwt_identity()
+    data = request.get_json(silent=True) or {}
+    
+    try:
+        until = parse_timestamp(data.get('until'))
+    except ValueError:
+        return jsonify({'error': 'until must be an ISO 8601 timestamp'}), 400
+    
+    last_read_at = Chat.mark_conversation_read(current_user_id, user_id, up_to=data.get('up_to'), until=until)
+    if last_read_at is None:
+        return jsonify({'error': 'Message not found in this conversation'}), 404
+    
+    notify_messages_read(current_user_id, user_id, last_read_at)
+    return jsonify({'last_read_at': last_read_at}), 200
+
+@bp.route('/conversations/<user_id>/unread-count', methods=['GET'])
+@jwt_required()
+def get_unread_count(user_id):
+    count = Chat.count_unread(get_jwt_identity(), user_id)
+    return jsonify({'unreadCount': count}), 200
+
+def parse_timestamp(value):
+    """ISO 8601 string to a naive UTC datetime, as stored in Mongo"""
+    if not value:
+        return None
+    timestamp = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if timestamp.tzinfo:
+        timestamp = timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+    return timestamp
+
+def notify_messages_read(reader_id, other_user_id, last_read_at):
+    # Read receipt for the other side of the conversation, it reads its watermark on return
+    if not presence.is_online(other_user_id):
+        return
+    emit_scheduler.emit('messages_read', {
+        'conversation_id': Chat.conversation_key(reader_id, other_user_id),
+        'reader_id': reader_id,
+        'last_read_at': last_read_at
+    }, room=other_user_id)
+
+def message_event(message):
+    """new_message payload; `cursor` is what the client passes back as `since` on join"""
+    return {
+        'id': message['_id'],
+        'sender_id': message['sender_id'],
+        'content': message['content'],
+        'message_type': message['message_type'],
+        'created_at': message['created_at'],
+        'cursor': encode_cursor(message)
+    }
+
+def deliver_message(message):
+    # Offline receivers get it from the replay when they join again
+    if not presence.is_online(message['receiver_id']):
+        return
+    emit_scheduler.emit('new_message', message_event(message), room=message['receiver_id'])
+
+def replay_missed_messages(user_id, since):
+    """Emit messages received after `since` to the current connection in bounded batches"""
+    cursor = since
+    for _ in range(Chat.REPLAY_MAX_BATCHES):
+        messages, cursor, has_more = Chat.get_messages_since(user_id, cursor)
+        # Sent even when empty so the client knows it is up to date; has_more means join again from cursor
+        emit('missed_messages', {
+            'messages': [message_event(message) for message in messages],
+            'cursor': cursor,
+            'has_more': has_more
+        })
+        if not has_more:
+            return
+        socketio.sleep(0)
+
+# Users each connection joined the room of, for presence: sid -> {user_id}
+joined_users = {}
+
+# Identity each Socket.IO connection authenticated with at connect: sid -> (user_id, expires_at)
+socket_identities = {}
+
+def get_connection_user_id():
+    """User behind the current Socket.IO connection while its access token is valid"""
+    identity = socket_identities.get(request.sid)
+    if not identity or identity[1] <= time.time():
+        return None
+    return identity[0]
+
+def get_socket_user_id(data):
+    """Identity of a Socket.IO event from the access token it carries"""
+    token = (data or {}).get('token')
+    if not token:
+        return None
+    try:
+        return decode_token(token)['sub']
+    except Exception:
+        return None
+
 # Socket.IO event handlers
 @socketio.on('connect')
-def handle_connect():
+def handle_connect(auth=None):
+    # Anonymous connections (or expired tokens) are still accepted, a valid token enables send_message
+    token = (auth or {}).get('token')
+    if token:
+        try:
+            claims = decode_token(token)
+            socket_identities[request.sid] = (claims['sub'], claims['exp'])
+        except Exception:
+            pass
     print('Client connected')
 
 @socketio.on('disconnect')
 def handle_disconnect():
+    socket_identities.pop(request.sid, None)
+    for user_id in joined_users.pop(request.sid, ()):
+        presence.disconnect(user_id, request.sid)
     print('Client disconnected')
 
 @socketio.on('join')
 def handle_join(data):
     room = data.get('user_id')
     if room:
-        join_room(room)
-        print(f'User {room} joined their room')
\ No newline at end of file
+        # {batch: true} opts in to event_batch instead of one event per message
+        emit_scheduler.join(room, batching=bool(data.get('batch')))
+        joined_users.setdefault(request.sid, set()).add(room)
+        presence.connect(room, request.sid)
+        print(f'User {room} joined their room')
+        
+        # {since: <cursor of the last message seen>} replays what arrived while disconnected
+        since = data.get('since')
+        if since and get_connection_user_id() == room:
+            try:
+                replay_missed_messages(room, since)
+            except ValueError:
+                emit('missed_messages', {'error': 'Invalid cursor'})
+
+@socketio.on('mark_read')
+def handle_mark_read(data):
+    user_id = get_socket_user_id(data) or get_connection_user_id()
+    other_user_id = (data or {}).get('user_id')
+    if not user_id or not other_user_id:
+        return {'error': 'Authentication and user_id are required'}
+    
+    try:
+        until = parse_timestamp(data.get('until'))
+    except ValueError:
+        return {'error': 'until must be an ISO 8601 timestamp'}
+    
+    last_read_at = Chat.mark_conversation_read(user_id, other_user_id, up_to=data.get('up_to'), until=until)
+    if last_read_at is None:
+        return {'error': 'Message not found in this conversation'}
+    
+    notify_messages_read(user_id, other_user_id, last_read_at)
+    return {'last_read_at': last_read_at}
+
+@socketio.on('send_message')
+def handle_send_message(data):
+    """Persist and deliver a message, the ack carries the stored id and timestamp"""
+    sender_id = get_connection_user_id()
+    if not sender_id:
+        return {'error': 'Authentication required, reconnect with a valid token'}
+    
+    data = data or {}
+    receiver_id = data.get('receiver_id')
+    if not receiver_id or not data.get('content'):
+        return {'error': 'receiver_id and content are required'}
+    
+    message = Chat.create_message(
+        sender_id=sender_id,
+        receiver_id=receiver_id,
+        content=data['content'],
+        message_type=data.get('message_type', 'text')
+    )
+    deliver_message(message)
+    
+    return {
+        'id': message['_id'],
+        'client_id': data.get('client_id'),
+        'sender_id': message['sender_id'],
+        'receiver_id': message['receiver_id'],
+        'content': message['content'],
+        'message_type': message['message_type'],
+        'created_at': message['created_at']
+    }
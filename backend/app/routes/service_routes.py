@@ -1,9 +1,12 @@
 from flask import Blueprint, request, jsonify
 from app.models.service_request import ServiceRequest
 from app.services.notification_service import send_email_notification
-from flask_socketio import emit
-from app import socketio
+from app.services.email_templates import email_templates, SERVICE_TYPE_NAMES
+from app.services.emit_scheduler import emit_scheduler
+from app.services.admin_events import ADMIN_NAMESPACE, ADMIN_ROOM
+from app.middleware.http_cache import conditional, make_etag
 from datetime import datetime
+import json
 
 bp = Blueprint('services', __name__, url_prefix='/api/services')
 
@@ -31,175 +34,41 @@ def create_service_request():
         language=user_language  # Store the user's language preference
     )
     
-    # Get service type name for emails
-    service_types = {
-        'vide_maison': 'Vide Maison',
-        'vide_appartement': 'Vide Appartement',
-        'vide_grenier': 'Vide Grenier',
-        'vide_locaux': 'Vide Locaux Professionnels',
-        'vide_bureau': 'Vide Bureau',
-        'nettoyage': 'Nettoyage'
-    }
-    service_type_name = service_types.get(data['service_type'], data['service_type'])
-    
-    # Email translations
-    translations = {
-        'en': {
-            'admin_subject': 'New Service Request',
-            'admin_title': '🔔 New Service Request',
-            'admin_name': 'Name',
-            'admin_email': 'Email',
-            'admin_phone': 'Phone',
-            'admin_service': 'Service',
-            'admin_address': 'Address',
-            'admin_message': 'Message',
-            'admin_submitted': 'Submitted on',
-            'user_subject': 'Confirmation of your service request - Vide Maison',
-            'user_title': 'Vide Maison',
-            'user_thank_you': 'Thank you for your request!',
-            'user_dear': f'Dear {data["name"]},',
-            'user_received': f'We have received your request for <strong>{service_type_name}</strong> at <strong>{data["address"]}</strong>.',
-            'user_contact': f'Our team will review your request and contact you within <strong>24 hours</strong> at <strong>{data["phone"]}</strong>.',
-            'user_details': 'Your request details:',
-            'user_service': 'Service',
-            'user_address': 'Address',
-            'user_message': 'Message',
-            'user_regards': 'Best regards,',
-            'user_team': 'The Vide Maison Team',
-            'user_footer': 'Vide Maison - Professional Clearance Service<br>Brussels and Surroundings'
-        },
-        'fr': {
-            'admin_subject': 'Nouvelle Demande de Service',
-            'admin_title': '🔔 Nouvelle Demande de Service',
-            'admin_name': 'Nom',
-            'admin_email': 'Email',
-            'admin_phone': 'Téléphone',
-            'admin_service': 'Service',
-            'admin_address': 'Adresse',
-            'admin_message': 'Message',
-            'admin_submitted': 'Soumis le',
-            'user_subject': 'Confirmation de votre demande de service - Vide Maison',
-            'user_title': 'Vide Maison',
-            'user_thank_you': 'Merci pour votre demande!',
-            'user_dear': f'Cher(e) {data["name"]},',
-            'user_received': f'Nous avons bien reçu votre demande pour <strong>{service_type_name}</strong> à <strong>{data["address"]}</strong>.',
-            'user_contact': f'Notre équipe examinera votre demande et vous contactera dans les <strong>24 heures</strong> au <strong>{data["phone"]}</strong>.',
-            'user_details': 'Détails de votre demande:',
-            'user_service': 'Service',
-            'user_address': 'Adresse',
-            'user_message': 'Message',
-            'user_regards': 'Cordialement,',
-            'user_team': "L'équipe Vide Maison",
-            'user_footer': 'Vide Maison - Service Professionnel de Débarras<br>Bruxelles et Environs'
-        },
-        'nl': {
-            'admin_subject': 'Nieuwe Serviceaanvraag',
-            'admin_title': '🔔 Nieuwe Serviceaanvraag',
-            'admin_name': 'Naam',
-            'admin_email': 'Email',
-            'admin_phone': 'Telefoon',
-            'admin_service': 'Dienst',
-            'admin_address': 'Adres',
-            'admin_message': 'Bericht',
-            'admin_submitted': 'Ingediend op',
-            'user_subject': 'Bevestiging van uw serviceaanvraag - Vide Maison',
-            'user_title': 'Vide Maison',
-            'user_thank_you': 'Bedankt voor uw aanvraag!',
-            'user_dear': f'Beste {data["name"]},',
-            'user_received': f'We hebben uw aanvraag voor <strong>{service_type_name}</strong> op <strong>{data["address"]}</strong> goed ontvangen.',
-            'user_contact': f'Ons team zal uw aanvraag bekijken en binnen <strong>24 uur</strong> contact met u opnemen op <strong>{data["phone"]}</strong>.',
-            'user_details': 'Details van uw aanvraag:',
-            'user_service': 'Dienst',
-            'user_address': 'Adres',
-            'user_message': 'Bericht',
-            'user_regards': 'Met vriendelijke groet,',
-            'user_team': 'Het Vide Maison Team',
-            'user_footer': 'Vide Maison - Professionele Ontruimingsdienst<br>Brussel en Omgeving'
-        }
-    }
+    service_type_name = SERVICE_TYPE_NAMES.get(data['service_type'], data['service_type'])
     
     # Default to French if language not available
-    lang = user_language if user_language in translations else 'fr'
-    trans = translations[lang]
-    
-    # Send email notification to admin with HTML template in admin language (always French)
-    admin_email_html = f""" 
-    <html> 
-        <body style="font-family: Arial, sans-serif; background-color: #f4f4f4; padding: 20px;"> 
-            <div style="max-width: 600px; margin: 0 auto; background-color: white; border-radius: 10px; padding: 30px; box-shadow: 0 2px 10px rgba(0,0,0,0.1);"> 
-                <h2 style="color: #d4af37; border-bottom: 2px solid #d4af37; padding-bottom: 10px;">{translations['fr']['admin_title']}</h2> 
-                <div style="margin: 20px 0;"> 
-                    <p style="margin: 10px 0;"><strong>{translations['fr']['admin_name']}:</strong> {data['name']}</p> 
-                    <p style="margin: 10px 0;"><strong>{translations['fr']['admin_email']}:</strong> {data['email']}</p> 
-                    <p style="margin: 10px 0;"><strong>{translations['fr']['admin_phone']}:</strong> {data['phone']}</p> 
-                    <p style="margin: 10px 0;"><strong>{translations['fr']['admin_service']}:</strong> {service_type_name}</p> 
-                    <p style="margin: 10px 0;"><strong>{translations['fr']['admin_address']}:</strong> {data['address']}</p> 
-                    <p style="margin: 10px 0;"><strong>{translations['fr']['admin_message']}:</strong> {data['message']}</p> 
-                    <p style="margin: 10px 0;"><strong>Langue/Language:</strong> {lang.upper()}</p>
-                </div> 
-                <div style="margin-top: 30px; padding-top: 20px; border-top: 1px solid #eee;"> 
-                    <p style="color: #666; font-size: 12px;">{translations['fr']['admin_submitted']}: {datetime.now().strftime('%d/%m/%Y à %H:%M')}</p> 
-                </div> 
-            </div> 
-        </body> 
-    </html> 
-    """
+    lang = user_language if email_templates.has_language(user_language) else 'fr'
+    fields = {
+        'name': data['name'],
+        'email': data['email'],
+        'phone': data['phone'],
+        'address': data['address'],
+        'service': service_type_name,
+        'message': data['message'],
+        'language': lang.upper(),
+        'submitted_at': datetime.now().strftime('%d/%m/%Y à %H:%M')
+    }
     
+    # Send email notification to admin (always French)
+    admin_email = email_templates.render('new_request_admin', 'fr', fields)
     send_email_notification(
-        translations['fr']['admin_subject'],
-        f'New service request from {data["name"]} for {service_type_name} service.',
+        admin_email.subject,
+        admin_email.body,
         'alifar1457@gmail.com',
-        html=admin_email_html
+        html=admin_email.html
     )
     
-    # Send confirmation email to user with HTML template in user's language
-    customer_email_html = f""" 
-    <html> 
-        <body style="font-family: Arial, sans-serif; background-color: #f4f4f4; padding: 20px;"> 
-            <div style="max-width: 600px; margin: 0 auto; background-color: white; border-radius: 10px; padding: 30px; box-shadow: 0 2px 10px rgba(0,0,0,0.1);"> 
-                <h2 style="color: #d4af37; text-align: center;">{trans['user_title']}</h2> 
-                <h3 style="color: #333;">{trans['user_thank_you']}</h3> 
-                <p style="color: #666; line-height: 1.6;"> 
-                    {trans['user_dear']} 
-                </p> 
-                <p style="color: #666; line-height: 1.6;"> 
-                    {trans['user_received']} 
-                </p> 
-                <p style="color: #666; line-height: 1.6;"> 
-                    {trans['user_contact']} 
-                </p> 
-                <div style="background-color: #f9f9f9; border-left: 4px solid #d4af37; padding: 15px; margin: 20px 0;"> 
-                    <p style="margin: 0; color: #333;"><strong>{trans['user_details']}</strong></p> 
-                    <p style="margin: 5px 0; color: #666;">{trans['user_service']}: {service_type_name}</p> 
-                    <p style="margin: 5px 0; color: #666;">{trans['user_address']}: {data['address']}</p> 
-                    <p style="margin: 5px 0; color: #666;">{trans['user_message']}: {data['message']}</p> 
-                </div> 
-                <p style="color: #666; line-height: 1.6;"> 
-                    {trans['user_regards']}<br> 
-                    <strong>{trans['user_team']}</strong> 
-                </p> 
-                <div style="margin-top: 30px; padding-top: 20px; border-top: 1px solid #eee; text-align: center;"> 
-                    <p style="color: #999; font-size: 12px;"> 
-                        {trans['user_footer']} 
-                    </p> 
-                </div> 
-            </div> 
-        </body> 
-    </html> 
-    """
-    
-    # Create plain text version for fallback
-    plain_text = f"{trans['user_dear']}\n\n{data['name'].replace('<strong>', '').replace('</strong>', '')},\n\n{trans['user_received'].replace('<strong>', '').replace('</strong>', '')}\n\n{trans['user_contact'].replace('<strong>', '').replace('</strong>', '')}\n\n{trans['user_details']}\n{trans['user_service']}: {service_type_name}\n{trans['user_address']}: {data['address']}\n{trans['user_message']}: {data['message']}\n\n{trans['user_regards']}\n{trans['user_team']}\n"
-    
+    # Send confirmation email to user in user's language
+    customer_email = email_templates.render('request_confirmation', lang, fields)
     send_email_notification(
-        trans['user_subject'],
-        plain_text,
+        customer_email.subject,
+        customer_email.body,
         data['email'],
-        html=customer_email_html
+        html=customer_email.html
     )
     
     # Send real-time notification to admin
-    socketio.emit('new_request', {
+    emit_scheduler.emit('new_request', {
         'id': service_request['_id'],
         'name': service_request['name'],
         'service_type': service_request['service_type'],
@@ -207,24 +76,21 @@ def create_service_request():
         'phone': service_request['phone'],
         'address': service_request['address'],
         'language': user_language,  # Include language in the notification
-        'created_at': service_request['created_at'].isoformat()
-    }, namespace='/admin')
+        'created_at': service_request['created_at']
+    }, room=ADMIN_ROOM, namespace=ADMIN_NAMESPACE)
     
     return jsonify({
         'message': 'Service request submitted successfully',
         'request_id': service_request['_id']
     }), 201
 
+# The catalogue only changes with a deploy, so its validator is computed once
+SERVICE_TYPES_ETAG = make_etag(json.dumps(SERVICE_TYPE_NAMES, sort_keys=True))
+
 @bp.route('/types', methods=['GET'])
+@conditional(lambda: (SERVICE_TYPES_ETAG, None), cache_control='public, max-age=3600')
 def get_service_types():
     # Return list of service types
-    service_types = [
-        {'id': 'vide_maison', 'name': 'Vide Maison'},
-        {'id': 'vide_appartement', 'name': 'Vide Appartement'},
-        {'id': 'vide_grenier', 'name': 'Vide Grenier'},
-        {'id': 'vide_locaux', 'name': 'Vide Locaux Professionnels'},
-        {'id': 'vide_bureau', 'name': 'Vide Bureau'},
-        {'id': 'nettoyage', 'name': 'Nettoyage'}
-    ]
+    service_types = [{'id': key, 'name': name} for key, name in SERVICE_TYPE_NAMES.items()]
     
     return jsonify(service_types), 200
\ No newline at end of file
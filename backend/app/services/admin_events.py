@@ -0,0 +1,37 @@
+from app.services.emit_scheduler import emit_scheduler
+
+ADMIN_NAMESPACE = '/admin'
+# Every authenticated admin connection is in this room
+ADMIN_ROOM = 'admins'
+
+# Request status -> dashboard counter it is tallied under
+STATUS_COUNTERS = {
+    'pending': 'pendingRequests',
+    'in_progress': 'inProgressRequests',
+    'completed': 'completedRequests',
+    'cancelled': 'cancelledRequests'
+}
+
+
+def publish_dashboard_delta(counters, **details):
+    """Push counter increments (and what caused them) to every connected admin"""
+    counters = {key: value for key, value in counters.items() if value}
+    if not counters and not details:
+        return
+    try:
+        emit_scheduler.emit('dashboard_delta', dict(details, counters=counters), room=ADMIN_ROOM, namespace=ADMIN_NAMESPACE)
+    except Exception as e:
+        # A lost delta is corrected by the next snapshot, it must not fail the write
+        print(f"Error publishing dashboard delta: {e}")
+
+
+def status_transition_counters(old_status, new_status, counts_today):
+    """Counter changes for a status change; the per-status cards only count today's requests"""
+    counters = {}
+    if not counts_today or old_status == new_status:
+        return counters
+    if old_status in STATUS_COUNTERS:
+        counters[STATUS_COUNTERS[old_status]] = -1
+    if new_status in STATUS_COUNTERS:
+        counters[STATUS_COUNTERS[new_status]] = 1
+    return counters
@@ -0,0 +1,277 @@
+from app import app
+from collections import namedtuple
+from operator import itemgetter
+from html import escape
+import json
+import os
+import re
+
+# Service type display names shared by the routes and the email templates
+SERVICE_TYPE_NAMES = {
+    'vide_maison': 'Vide Maison',
+    'vide_appartement': 'Vide Appartement',
+    'vide_grenier': 'Vide Grenier',
+    'vide_locaux': 'Vide Locaux Professionnels',
+    'vide_bureau': 'Vide Bureau',
+    'nettoyage': 'Nettoyage'
+}
+
+RenderedEmail = namedtuple('RenderedEmail', ['subject', 'body', 'html'])
+
+# {{t:section.key}} is resolved from the locale files when a template is compiled,
+# {{field}} is filled in from the per-request values when it is rendered.
+TRANSLATION_PATTERN = re.compile(r'\{\{\s*t:([\w.]+)\s*\}\}')
+FIELD_PATTERN = re.compile(r'\{\{\s*(\w+)\s*\}\}')
+
+LAYOUTS = {
+    'new_request_admin': {
+        'subject': '{{t:newRequestAdmin.subject}}',
+        'body': 'New service request from {{name}} for {{service}} service.',
+        'html': """
+    <html>
+        <body style="font-family: Arial, sans-serif; background-color: #f4f4f4; padding: 20px;">
+            <div style="max-width: 600px; margin: 0 auto; background-color: white; border-radius: 10px; padding: 30px; box-shadow: 0 2px 10px rgba(0,0,0,0.1);">
+                <h2 style="color: #d4af37; border-bottom: 2px solid #d4af37; padding-bottom: 10px;">{{t:newRequestAdmin.title}}</h2>
+                <div style="margin: 20px 0;">
+                    <p style="margin: 10px 0;"><strong>{{t:newRequestAdmin.name}}:</strong> {{name}}</p>
+                    <p style="margin: 10px 0;"><strong>{{t:newRequestAdmin.email}}:</strong> {{email}}</p>
+                    <p style="margin: 10px 0;"><strong>{{t:newRequestAdmin.phone}}:</strong> {{phone}}</p>
+                    <p style="margin: 10px 0;"><strong>{{t:newRequestAdmin.service}}:</strong> {{service}}</p>
+                    <p style="margin: 10px 0;"><strong>{{t:newRequestAdmin.address}}:</strong> {{address}}</p>
+                    <p style="margin: 10px 0;"><strong>{{t:newRequestAdmin.message}}:</strong> {{message}}</p>
+                    <p style="margin: 10px 0;"><strong>{{t:newRequestAdmin.language}}:</strong> {{language}}</p>
+                </div>
+                <div style="margin-top: 30px; padding-top: 20px; border-top: 1px solid #eee;">
+                    <p style="color: #666; font-size: 12px;">{{t:newRequestAdmin.submitted}}: {{submitted_at}}</p>
+                </div>
+            </div>
+        </body>
+    </html>
+    """
+    },
+    'request_confirmation': {
+        'subject': '{{t:requestConfirmation.subject}}',
+        'body': (
+            '{{t:requestConfirmation.dear}}\n\n'
+            '{{t:requestConfirmation.received}}\n\n'
+            '{{t:requestConfirmation.contact}}\n\n'
+            '{{t:requestConfirmation.details}}\n'
+            '{{t:requestConfirmation.service}}: {{service}}\n'
+            '{{t:requestConfirmation.address}}: {{address}}\n'
+            '{{t:requestConfirmation.message}}: {{message}}\n\n'
+            '{{t:requestConfirmation.regards}}\n'
+            '{{t:requestConfirmation.team}}\n'
+        ),
+        'html': """
+    <html>
+        <body style="font-family: Arial, sans-serif; background-color: #f4f4f4; padding: 20px;">
+            <div style="max-width: 600px; margin: 0 auto; background-color: white; border-radius: 10px; padding: 30px; box-shadow: 0 2px 10px rgba(0,0,0,0.1);">
+                <h2 style="color: #d4af37; text-align: center;">{{t:requestConfirmation.title}}</h2>
+                <h3 style="color: #333;">{{t:requestConfirmation.thankYou}}</h3>
+                <p style="color: #666; line-height: 1.6;">
+                    {{t:requestConfirmation.dear}}
+                </p>
+                <p style="color: #666; line-height: 1.6;">
+                    {{t:requestConfirmation.received}}
+                </p>
+                <p style="color: #666; line-height: 1.6;">
+                    {{t:requestConfirmation.contact}}
+                </p>
+                <div style="background-color: #f9f9f9; border-left: 4px solid #d4af37; padding: 15px; margin: 20px 0;">
+                    <p style="margin: 0; color: #333;"><strong>{{t:requestConfirmation.details}}</strong></p>
+                    <p style="margin: 5px 0; color: #666;">{{t:requestConfirmation.service}}: {{service}}</p>
+                    <p style="margin: 5px 0; color: #666;">{{t:requestConfirmation.address}}: {{address}}</p>
+                    <p style="margin: 5px 0; color: #666;">{{t:requestConfirmation.message}}: {{message}}</p>
+                </div>
+                <p style="color: #666; line-height: 1.6;">
+                    {{t:requestConfirmation.regards}}<br>
+                    <strong>{{t:requestConfirmation.team}}</strong>
+                </p>
+                <div style="margin-top: 30px; padding-top: 20px; border-top: 1px solid #eee; text-align: center;">
+                    <p style="color: #999; font-size: 12px;">
+                        {{t:requestConfirmation.footer}}
+                    </p>
+                </div>
+            </div>
+        </body>
+    </html>
+    """
+    },
+    'status_completed': {
+        'subject': '{{t:statusCompleted.subject}}',
+        'body': (
+            '{{t:statusCompleted.dear}}\n\n'
+            '{{t:statusCompleted.body}}\n\n'
+            '{{t:statusCompleted.thanks}}\n\n'
+            '{{t:statusCompleted.regards}}\n'
+            '{{t:statusCompleted.team}}\n'
+        ),
+        'html': """
+            <html>
+                <body style="font-family: Arial, sans-serif; background-color: #f4f4f4; padding: 20px;">
+                    <div style="max-width: 600px; margin: 0 auto; background-color: white; border-radius: 10px; padding: 30px;">
+                        <h2 style="color: #4caf50; text-align: center;">{{t:statusCompleted.title}}</h2>
+                        <p style="color: #666;">{{t:statusCompleted.dear}}</p>
+                        <p style="color: #666;">
+                            {{t:statusCompleted.body}}
+                        </p>
+                        <p style="color: #666;">
+                            {{t:statusCompleted.thanks}}
+                        </p>
+                        <p style="color: #666;">
+                            {{t:statusCompleted.regards}}<br>
+                            <strong>{{t:statusCompleted.team}}</strong>
+                        </p>
+                    </div>
+                </body>
+            </html>
+            """
+    },
+    'status_cancelled': {
+        'subject': '{{t:statusCancelled.subject}}',
+        'body': (
+            '{{t:statusCancelled.dear}}\n\n'
+            '{{t:statusCancelled.body}}\n\n'
+            '{{t:statusCancelled.reason}} {{reason}}\n\n'
+            '{{t:statusCancelled.questions}}\n\n'
+            '{{t:statusCancelled.regards}}\n'
+            '{{t:statusCancelled.team}}\n'
+        ),
+        'html': """
+            <html>
+                <body style="font-family: Arial, sans-serif; background-color: #f4f4f4; padding: 20px;">
+                    <div style="max-width: 600px; margin: 0 auto; background-color: white; border-radius: 10px; padding: 30px;">
+                        <h2 style="color: #e74c3c; text-align: center;">{{t:statusCancelled.title}}</h2>
+                        <p style="color: #666;">{{t:statusCancelled.dear}}</p>
+                        <p style="color: #666;">
+                            {{t:statusCancelled.body}}
+                        </p>
+                        <p style="color: #666;">
+                            <strong>{{t:statusCancelled.reason}}</strong> {{reason}}
+                        </p>
+                        <p style="color: #666;">
+                            {{t:statusCancelled.questions}}
+                        </p>
+                        <p style="color: #666;">
+                            {{t:statusCancelled.regards}}<br>
+                            <strong>{{t:statusCancelled.team}}</strong>
+                        </p>
+                    </div>
+                </body>
+            </html>
+            """
+    }
+}
+
+
+class TemplateFields(dict):
+    """Field mapping that renders missing fields as empty strings"""
+
+    def __missing__(self, key):
+        return ''
+
+
+class CompiledTemplate:
+    """Template split once into static chunks and field names, rendered with a single join"""
+
+    __slots__ = ('chunks', 'names', 'lookup')
+
+    def __init__(self, source):
+        # FIELD_PATTERN.split puts the field names at the odd positions
+        self.chunks = FIELD_PATTERN.split(source)
+        self.names = self.chunks[1::2]
+        # Fetches every field value in one call; with a single name it returns a bare value
+        self.lookup = itemgetter(*self.names) if self.names else None
+
+    def __call__(self, fields):
+        if self.lookup is None:
+            return self.chunks[0]
+        chunks = self.chunks[:]
+        if len(self.names) == 1:
+            chunks[1] = self.lookup(fields)
+        else:
+            chunks[1::2] = self.lookup(fields)
+        return ''.join(chunks)
+
+
+class EmailTemplateRegistry:
+    """Compiles every (template, language) pair from the shared locale files"""
+
+    def __init__(self, locales_dir, default_language='fr'):
+        self.locales_dir = locales_dir
+        self.default_language = default_language
+        self.templates = {}
+        self.strings = {}
+
+    def load(self):
+        templates = {}
+        strings_by_language = {}
+        for filename in sorted(os.listdir(self.locales_dir)):
+            language, ext = os.path.splitext(filename)
+            if ext != '.json':
+                continue
+            with open(os.path.join(self.locales_dir, filename), encoding='utf-8') as f:
+                strings = json.load(f).get('email')
+            if not strings:
+                continue
+            strings_by_language[language] = strings
+            for name, layout in LAYOUTS.items():
+                templates[(name, language)] = RenderedEmail(
+                    subject=CompiledTemplate(self._translate(layout['subject'], strings, plain=True)),
+                    body=CompiledTemplate(self._translate(layout['body'], strings, plain=True)),
+                    html=CompiledTemplate(self._translate(layout['html'], strings))
+                )
+
+        if self.default_language not in strings_by_language:
+            raise ValueError(f"No email strings found for default language '{self.default_language}' in {self.locales_dir}")
+
+        self.templates = templates
+        self.strings = strings_by_language
+        return self
+
+    def has_language(self, language):
+        return language in self.strings
+
+    def translate(self, key, language):
+        """Look up a single email string, e.g. 'statusCancelled.noReason'"""
+        value = self.strings.get(language) or self.strings[self.default_language]
+        for part in key.split('.'):
+            value = value[part]
+        return value
+
+    def render(self, name, language, fields):
+        """Fill a compiled template, falling back to the default language; missing fields render empty"""
+        template = self.templates.get((name, language)) or self.templates[(name, self.default_language)]
+        plain = TemplateFields(fields)
+        try:
+            joined = ''.join(plain.values())
+        except TypeError:
+            # Values come from JSON bodies and documents, so numbers and None show up too
+            for key, value in plain.items():
+                if not isinstance(value, str):
+                    plain[key] = '' if value is None else str(value)
+            joined = ''.join(plain.values())
+        escaped = plain
+        # Fields only ever land in element text, so quotes can stay as they are
+        if '&' in joined or '<' in joined or '>' in joined:
+            escaped = TemplateFields((key, escape(value, quote=False)) for key, value in plain.items())
+        return RenderedEmail(
+            subject=template.subject(plain),
+            body=template.body(plain),
+            html=template.html(escaped)
+        )
+
+    @staticmethod
+    def _translate(source, strings, plain=False):
+        def lookup(match):
+            value = strings
+            for key in match.group(1).split('.'):
+                value = value[key]
+            if plain:
+                value = re.sub(r'<br\s*/?>', '\n', value)
+                value = re.sub(r'<[^>]+>', '', value)
+            return value
+        return TRANSLATION_PATTERN.sub(lookup, source)
+
+
+email_templates = EmailTemplateRegistry(app.config['EMAIL_LOCALES_DIR']).load()
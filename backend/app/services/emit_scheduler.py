@@ -0,0 +1,124 @@
+from app import app, socketio
+from flask_socketio import join_room
+import threading
+import time
+
+# Clients that accept batches join this variant of a room instead of the room itself
+BATCH_ROOM_PREFIX = 'batch:'
+
+
+class EmitScheduler:
+    """Coalesces Socket.IO emits per (namespace, room) over a short window.
+
+    Clients that joined with batching get one `event_batch` per window; every other
+    client in the room still gets the events one by one, in order.
+    """
+
+    def __init__(self, socketio, window=0.075, max_batch=100):
+        self.socketio = socketio
+        self.window = window
+        self.max_batch = max_batch
+        self.pending = {}
+        self.lock = threading.Lock()
+        self.counters = {
+            'events': 0,
+            'batches': 0,
+            'max_batch_size': 0,
+            'total_latency': 0.0,
+            'max_latency': 0.0
+        }
+
+    def join(self, room, batching=False):
+        """Put the current client in room, or in its batch variant if it handles batches"""
+        join_room(BATCH_ROOM_PREFIX + room if batching else room)
+
+    def emit(self, event, data, room, namespace='/'):
+        """Queue an event for room; it goes out within `window` seconds"""
+        if self.window <= 0:
+            return self.emit_now(event, data, room, namespace)
+
+        key = (namespace, room)
+        with self.lock:
+            events = self.pending.get(key)
+            start_timer = events is None
+            if start_timer:
+                events = self.pending[key] = []
+            events.append((event, data, time.monotonic()))
+            full = len(events) >= self.max_batch
+
+        if full:
+            self.flush(key)
+        elif start_timer:
+            self.socketio.start_background_task(self._flush_later, key)
+
+    def emit_now(self, event, data, room, namespace='/'):
+        """Send one event to both variants of room without waiting for a window"""
+        self.socketio.emit(event, data, to=room, namespace=namespace)
+        self.socketio.emit(event, data, to=BATCH_ROOM_PREFIX + room, namespace=namespace)
+
+    def flush(self, key):
+        with self.lock:
+            events = self.pending.pop(key, None)
+        if not events:
+            return
+
+        namespace, room = key
+        try:
+            # Per-event fallback for clients that do not understand batches
+            for event, data, _ in events:
+                self.socketio.emit(event, data, to=room, namespace=namespace)
+            if len(events) == 1:
+                event, data, _ = events[0]
+                self.socketio.emit(event, data, to=BATCH_ROOM_PREFIX + room, namespace=namespace)
+            else:
+                self.socketio.emit('event_batch', {
+                    'events': [{'event': event, 'data': data} for event, data, _ in events]
+                }, to=BATCH_ROOM_PREFIX + room, namespace=namespace)
+        except Exception as e:
+            app.logger.error(f"Error emitting {len(events)} event(s) to {namespace} {room}: {e}")
+        self._record(events)
+
+    def flush_all(self):
+        with self.lock:
+            keys = list(self.pending)
+        for key in keys:
+            self.flush(key)
+
+    def stats(self):
+        with self.lock:
+            counters = dict(self.counters)
+            pending = sum(len(events) for events in self.pending.values())
+        events = counters.pop('events')
+        batches = counters.pop('batches')
+        total_latency = counters.pop('total_latency')
+        return {
+            'window_ms': self.window * 1000,
+            'events': events,
+            'batches': batches,
+            'pending': pending,
+            'avg_batch_size': round(events / batches, 2) if batches else 0,
+            'max_batch_size': counters['max_batch_size'],
+            'avg_latency_ms': round(total_latency / events * 1000, 2) if events else 0,
+            'max_latency_ms': round(counters['max_latency'] * 1000, 2)
+        }
+
+    def _flush_later(self, key):
+        self.socketio.sleep(self.window)
+        self.flush(key)
+
+    def _record(self, events):
+        now = time.monotonic()
+        latencies = [now - queued_at for _, _, queued_at in events]
+        with self.lock:
+            self.counters['events'] += len(events)
+            self.counters['batches'] += 1
+            self.counters['max_batch_size'] = max(self.counters['max_batch_size'], len(events))
+            self.counters['total_latency'] += sum(latencies)
+            self.counters['max_latency'] = max(self.counters['max_latency'], max(latencies))
+
+
+emit_scheduler = EmitScheduler(
+    socketio,
+    window=app.config['SOCKETIO_EMIT_WINDOW_MS'] / 1000,
+    max_batch=app.config['SOCKETIO_EMIT_MAX_BATCH']
+)
@@ -1,6 +1,187 @@
-from app import mail
+from app import app, mail
 from flask_mail import Message
 from datetime import datetime
+import atexit
+import os
+import queue
+import threading
+import time
+
+
+class EmailDispatcher:
+    """Bounded email queue drained by worker threads holding pooled SMTP connections"""
+
+    def __init__(self, app=None):
+        self.app = app
+        self.queue = None
+        self.workers = []
+        self.pid = None
+        self.lock = threading.Lock()
+        self.stats_lock = threading.Lock()
+        self.stats = {'queued': 0, 'sent': 0, 'retried': 0, 'failed': 0, 'sync': 0}
+        # Failed messages waiting out their backoff, they are in no queue until it ends
+        self.pending_retries = 0
+
+    def init_app(self, app):
+        self.app = app
+
+    @property
+    def is_async(self):
+        return self.app.config.get('MAIL_ASYNC', True) and not self.app.testing
+
+    def submit(self, message):
+        """Queue a message for delivery, falling back to a synchronous send"""
+        if not self.is_async:
+            return self.send_now(message)
+
+        self._ensure_started()
+        return self._enqueue(message, attempt=0)
+
+    def send_now(self, message):
+        """Deliver a message on the calling thread with a one-off connection"""
+        with self.app.app_context():
+            try:
+                with mail.connect() as connection:
+                    connection.send(message)
+                self._count('sync')
+                return True
+            except Exception as e:
+                self._count('failed')
+                self.app.logger.error(f"Error sending email: {e}")
+                return False
+
+    def flush(self, timeout=None):
+        """Wait until every queued message, retries still in their backoff included, has been handled"""
+        if not self.queue:
+            return True
+        deadline = time.monotonic() + timeout if timeout else None
+        while self.queue.unfinished_tasks or self.pending_retries:
+            if deadline and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.05)
+        return True
+
+    def shutdown(self, timeout=10):
+        """Drain the queue and stop the workers"""
+        with self.lock:
+            if not self.workers or self.pid != os.getpid():
+                return
+            if not self.flush(timeout):
+                self.app.logger.warning(
+                    f"Stopping email workers with {self.queue.unfinished_tasks} queued "
+                    f"and {self.pending_retries} retrying messages not sent"
+                )
+            for _ in self.workers:
+                self.queue.put(None)
+            for worker in self.workers:
+                worker.join(timeout)
+            self.workers = []
+
+    def _ensure_started(self):
+        # Workers do not survive a fork, so each gunicorn worker starts its own pool
+        if self.workers and self.pid == os.getpid():
+            return
+        with self.lock:
+            if self.workers and self.pid == os.getpid():
+                return
+            self.pid = os.getpid()
+            self.queue = queue.Queue(maxsize=self.app.config.get('MAIL_QUEUE_SIZE', 500))
+            self.workers = []
+            for i in range(self.app.config.get('MAIL_WORKERS', 2)):
+                worker = threading.Thread(target=self._work, name=f'email-worker-{i}', daemon=True)
+                worker.start()
+                self.workers.append(worker)
+
+    def _enqueue(self, message, attempt):
+        try:
+            self.queue.put_nowait((message, attempt))
+            self._count('queued')
+            return True
+        except queue.Full:
+            self.app.logger.warning("Email queue full, sending synchronously")
+            return self.send_now(message)
+
+    def _work(self):
+        idle_timeout = self.app.config.get('MAIL_IDLE_TIMEOUT', 30)
+        connection = None
+        last_used = 0
+
+        with self.app.app_context():
+            while True:
+                try:
+                    job = self.queue.get(timeout=idle_timeout)
+                except queue.Empty:
+                    # Release idle SMTP sessions before the relay drops them
+                    connection = self._close(connection)
+                    continue
+
+                if job is None:
+                    self._close(connection)
+                    self.queue.task_done()
+                    return
+
+                message, attempt = job
+                if connection and time.monotonic() - last_used > idle_timeout:
+                    connection = self._close(connection)
+
+                try:
+                    if connection is None:
+                        connection = self._open()
+                    connection.send(message)
+                    self._count('sent')
+                except Exception as e:
+                    connection = self._close(connection)
+                    self._retry(message, attempt, e)
+                finally:
+                    last_used = time.monotonic()
+                    self.queue.task_done()
+
+    def _retry(self, message, attempt, error):
+        max_retries = self.app.config.get('MAIL_MAX_RETRIES', 3)
+        if attempt >= max_retries:
+            self._count('failed')
+            self.app.logger.error(f"Error sending email to {message.recipients}: {error}")
+            return
+
+        delay = self.app.config.get('MAIL_RETRY_BACKOFF', 2.0) * (2 ** attempt)
+        self._count('retried')
+        self.app.logger.warning(f"Email delivery failed ({error}), retrying in {delay}s")
+        # Counted before the failed job is marked done, so flush() always sees the message somewhere
+        with self.stats_lock:
+            self.pending_retries += 1
+        timer = threading.Timer(delay, self._requeue, args=(message, attempt + 1))
+        timer.daemon = True
+        timer.start()
+
+    def _requeue(self, message, attempt):
+        try:
+            self._enqueue(message, attempt)
+        finally:
+            # The message is queued (or was sent synchronously) by now
+            with self.stats_lock:
+                self.pending_retries -= 1
+
+    def _open(self):
+        connection = mail.connect()
+        connection.__enter__()
+        return connection
+
+    def _close(self, connection):
+        if connection is not None:
+            try:
+                connection.__exit__(None, None, None)
+            except Exception:
+                pass
+        return None
+
+    def _count(self, key):
+        with self.stats_lock:
+            self.stats[key] += 1
+
+
+email_dispatcher = EmailDispatcher(app)
+atexit.register(email_dispatcher.shutdown)
+
 
 def send_email_notification(subject, body, recipient, html=None):
     try:
@@ -10,8 +191,7 @@ def send_email_notification(subject, body, recipient, html=None):
             body=body,
             html=html
         )
-        mail.send(msg)
-        return True
+        return email_dispatcher.submit(msg)
     except Exception as e:
         print(f"Error sending email: {e}")
-        return False
\ No newline at end of file
+        return False
@@ -0,0 +1,71 @@
+from app import app, socketio
+from concurrent.futures import ThreadPoolExecutor
+from passlib.hash import pbkdf2_sha256
+import threading
+
+
+class HashingBusyError(Exception):
+    """Raised when a hash waited longer than the queue timeout for a free slot"""
+
+
+class PasswordHasher:
+    """Runs pbkdf2 hashing on real OS threads so it never blocks the Socket.IO event loop"""
+
+    def __init__(self, rounds=29000, max_workers=4, queue_timeout=5, async_mode='threading'):
+        self.handler = pbkdf2_sha256.using(rounds=rounds)
+        self.rounds = rounds
+        self.queue_timeout = queue_timeout
+        self.async_mode = async_mode
+        self.executor = None
+        self.slots = self._create_semaphore(max_workers)
+        if async_mode not in ('eventlet', 'gevent', 'gevent_uwsgi'):
+            self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='password-hasher')
+
+    def hash(self, password):
+        return self._run(self.handler.hash, password)
+
+    def verify(self, password, stored_hash):
+        return self._run(pbkdf2_sha256.verify, password, stored_hash)
+
+    def needs_update(self, stored_hash):
+        """True when the stored hash was made with different rounds than configured"""
+        try:
+            return pbkdf2_sha256.from_string(stored_hash).rounds != self.rounds
+        except ValueError:
+            return False
+
+    def _run(self, fn, *args):
+        # At most max_workers hashes run at once; callers wait for a slot up to queue_timeout
+        if not self.slots.acquire(timeout=self.queue_timeout):
+            raise HashingBusyError('Password hashing queue is full')
+        try:
+            return self._execute(fn, *args)
+        finally:
+            self.slots.release()
+
+    def _execute(self, fn, *args):
+        if self.async_mode == 'eventlet':
+            from eventlet import tpool
+            return tpool.execute(fn, *args)
+        if self.async_mode in ('gevent', 'gevent_uwsgi'):
+            import gevent
+            return gevent.get_hub().threadpool.apply(fn, args)
+        return self.executor.submit(fn, *args).result()
+
+    def _create_semaphore(self, size):
+        # The semaphore has to yield to the event loop of the async mode in use
+        if self.async_mode == 'eventlet':
+            from eventlet.semaphore import BoundedSemaphore
+            return BoundedSemaphore(size)
+        if self.async_mode in ('gevent', 'gevent_uwsgi'):
+            from gevent.lock import BoundedSemaphore
+            return BoundedSemaphore(size)
+        return threading.BoundedSemaphore(size)
+
+
+password_hasher = PasswordHasher(
+    rounds=app.config['PASSWORD_HASH_ROUNDS'],
+    max_workers=app.config['PASSWORD_HASH_WORKERS'],
+    queue_timeout=app.config['PASSWORD_HASH_QUEUE_TIMEOUT'],
+    async_mode=socketio.async_mode
+)
@@ -0,0 +1,170 @@
+from app import app, socketio
+import os
+import socket
+import threading
+import uuid
+
+
+class MemoryPresenceRegistry:
+    """Socket.IO connections per user, for this process only.
+
+    With a message queue the user may be connected to another worker, so the
+    registry then reports everyone as online rather than dropping their events.
+    """
+
+    def __init__(self, authoritative=True):
+        self.authoritative = authoritative
+        self.connections = {}
+        self.lock = threading.Lock()
+        self.counters = {'online_checks': 0, 'offline_skips': 0}
+
+    def connect(self, user_id, sid):
+        with self.lock:
+            self.connections.setdefault(user_id, set()).add(sid)
+
+    def disconnect(self, user_id, sid):
+        with self.lock:
+            sids = self.connections.get(user_id)
+            if sids is not None:
+                sids.discard(sid)
+                if not sids:
+                    del self.connections[user_id]
+
+    def is_online(self, user_id):
+        with self.lock:
+            online = not self.authoritative or user_id in self.connections
+            self.counters['online_checks'] += 1
+            self.counters['offline_skips'] += not online
+            return online
+
+    def stats(self):
+        with self.lock:
+            return dict(self.counters, backend='memory', authoritative=self.authoritative, online_users=len(self.connections))
+
+
+class RedisPresenceRegistry:
+    """Connections per user shared by every worker.
+
+    Each user has a Redis hash of sid -> worker id, and every worker keeps a heartbeat
+    key alive while it runs. A user is online while one of their sids belongs to a live
+    worker: sids left behind by a worker that died stop counting once its heartbeat
+    expires, while a connection that stays open never expires.
+    """
+
+    # A worker missing heartbeats for HEARTBEAT_TTL seconds is taken as dead
+    HEARTBEAT_INTERVAL = 20
+    HEARTBEAT_TTL = 60
+    # Hashes of the users a worker serves are refreshed by its heartbeat; one left only
+    # by dead workers (and never looked up again) goes away after this long
+    KEY_TTL = 24 * 3600
+
+    def __init__(self, client, socketio, prefix='presence:'):
+        self.client = client
+        self.socketio = socketio
+        self.prefix = prefix
+        self.lock = threading.Lock()
+        self.counters = {'online_checks': 0, 'offline_skips': 0, 'stale_sids': 0}
+        # user -> sids connected to this worker
+        self.local = {}
+        self.worker_id = None
+        self.pid = None
+
+    def user_key(self, user_id):
+        return f'{self.prefix}user:{user_id}'
+
+    def worker_key(self, worker_id):
+        return f'{self.prefix}worker:{worker_id}'
+
+    def connect(self, user_id, sid):
+        self._ensure_heartbeat()
+        key = self.user_key(user_id)
+        with self.client.pipeline() as pipe:
+            pipe.hset(key, sid, self.worker_id)
+            pipe.expire(key, self.KEY_TTL)
+            pipe.execute()
+        with self.lock:
+            self.local.setdefault(user_id, set()).add(sid)
+
+    def disconnect(self, user_id, sid):
+        self.client.hdel(self.user_key(user_id), sid)
+        with self.lock:
+            sids = self.local.get(user_id)
+            if sids is not None:
+                sids.discard(sid)
+                if not sids:
+                    del self.local[user_id]
+
+    def is_online(self, user_id):
+        try:
+            online = self._has_live_connection(user_id)
+        except Exception as e:
+            # Without Redis, sending is the safe default
+            app.logger.warning(f"Presence lookup failed: {e}")
+            online = True
+        with self.lock:
+            self.counters['online_checks'] += 1
+            self.counters['offline_skips'] += not online
+        return online
+
+    def stats(self):
+        with self.lock:
+            return dict(self.counters, backend='redis', worker_id=self.worker_id, local_users=len(self.local))
+
+    def _has_live_connection(self, user_id):
+        key = self.user_key(user_id)
+        connections = {sid.decode(): worker.decode() for sid, worker in self.client.hgetall(key).items()}
+        if not connections:
+            return False
+        workers = sorted(set(connections.values()))
+        beats = self.client.mget([self.worker_key(worker) for worker in workers])
+        alive = {worker for worker, beat in zip(workers, beats) if beat is not None}
+
+        stale = [sid for sid, worker in connections.items() if worker not in alive]
+        if stale:
+            self.client.hdel(key, *stale)
+            with self.lock:
+                self.counters['stale_sids'] += len(stale)
+        return len(stale) < len(connections)
+
+    def _ensure_heartbeat(self):
+        # Background tasks do not survive a fork, so each gunicorn worker beats on its own
+        if self.pid == os.getpid():
+            return
+        with self.lock:
+            if self.pid == os.getpid():
+                return
+            pid = os.getpid()
+            self.worker_id = f'{socket.gethostname()}:{pid}:{uuid.uuid4().hex[:8]}'
+            self.local = {}
+            # The first beat is written before any sid points at this worker
+            self.client.set(self.worker_key(self.worker_id), 1, ex=self.HEARTBEAT_TTL)
+            self.pid = pid
+        self.socketio.start_background_task(self._heartbeat, pid)
+
+    def _heartbeat(self, pid):
+        while self.pid == pid:
+            self.socketio.sleep(self.HEARTBEAT_INTERVAL)
+            try:
+                self._beat()
+            except Exception as e:
+                app.logger.warning(f"Presence heartbeat failed: {e}")
+
+    def _beat(self):
+        with self.lock:
+            users = list(self.local)
+        with self.client.pipeline(transaction=False) as pipe:
+            pipe.set(self.worker_key(self.worker_id), 1, ex=self.HEARTBEAT_TTL)
+            for user_id in users:
+                pipe.expire(self.user_key(user_id), self.KEY_TTL)
+            pipe.execute()
+
+
+def create_presence_registry(config):
+    """Registry selected by PRESENCE_STORAGE ('memory' or 'redis')"""
+    if config.get('PRESENCE_STORAGE') == 'redis':
+        import redis
+        return RedisPresenceRegistry(redis.Redis.from_url(config['REDIS_URL']), socketio)
+    return MemoryPresenceRegistry(authoritative=not config.get('SOCKETIO_MESSAGE_QUEUE'))
+
+
+presence = create_presence_registry(app.config)
@@ -0,0 +1,64 @@
+from app import app
+from collections import OrderedDict
+import threading
+import time
+
+
+class PrincipalCache:
+    """Per-process TTL + LRU cache of the user fields JWT-protected endpoints check"""
+
+    def __init__(self, ttl=30, max_size=10000):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.counters = {'hits': 0, 'misses': 0, 'evictions': 0, 'invalidations': 0}
+        # Bumped on every invalidation so a load racing with a write is not cached
+        self.generation = 0
+
+    def get(self, user_id, loader):
+        """Cached principal for user_id, calling loader(user_id) on a miss"""
+        key = str(user_id)
+        now = time.monotonic()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[1] > now:
+                self.entries.move_to_end(key)
+                self.counters['hits'] += 1
+                return entry[0]
+            self.counters['misses'] += 1
+            generation = self.generation
+
+        principal = loader(user_id)
+        # Unknown ids are not cached, so a user created right after a miss is seen at once
+        if principal is not None:
+            with self.lock:
+                if generation != self.generation:
+                    return principal
+                self.entries[key] = (principal, now + self.ttl)
+                self.entries.move_to_end(key)
+                if len(self.entries) > self.max_size:
+                    self.entries.popitem(last=False)
+                    self.counters['evictions'] += 1
+        return principal
+
+    def invalidate(self, user_id):
+        # Only this process is invalidated, other workers catch up within ttl seconds
+        with self.lock:
+            self.generation += 1
+            if self.entries.pop(str(user_id), None) is not None:
+                self.counters['invalidations'] += 1
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def stats(self):
+        with self.lock:
+            return dict(self.counters, size=len(self.entries))
+
+
+principal_cache = PrincipalCache(
+    ttl=app.config['PRINCIPAL_CACHE_TTL'],
+    max_size=app.config['PRINCIPAL_CACHE_SIZE']
+)
@@ -0,0 +1,94 @@
+from app.json_provider import dumps_bytes, json_default
+from datetime import date, datetime, time, timedelta, timezone
+import csv
+import io
+import zlib
+
+# format -> (mimetype, file extension)
+EXPORT_FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'ndjson': ('application/x-ndjson', 'ndjson')
+}
+# Rows are grouped into chunks of about this many bytes before they are sent
+CHUNK_SIZE = 64 * 1024
+# Spreadsheets run a cell starting with one of these as a formula
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+def csv_value(value):
+    if value is None:
+        return ''
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    if isinstance(value, (int, float)):
+        return value
+    if not isinstance(value, str):
+        # ObjectId and datetimes read the same as in the JSON responses
+        value = json_default(value)
+    # Customer-supplied text is written as text, never evaluated (=HYPERLINK(...), +32 470...)
+    if value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def csv_chunks(documents, fields):
+    """Header and one row per document, written through a reused buffer"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(['id' if field == '_id' else field for field in fields])
+    for document in documents:
+        writer.writerow([csv_value(document.get(field)) for field in fields])
+        if buffer.tell() >= CHUNK_SIZE:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+def ndjson_chunks(documents, fields):
+    """One JSON object per line, keys in the same order as the CSV columns"""
+    chunk = bytearray()
+    for document in documents:
+        chunk += dumps_bytes({field: document.get(field) for field in fields})
+        chunk += b'\n'
+        if len(chunk) >= CHUNK_SIZE:
+            yield bytes(chunk)
+            chunk.clear()
+    if chunk:
+        yield bytes(chunk)
+
+
+def gzip_chunks(chunks, level=6):
+    """Compress a byte stream as it is produced, into a single gzip member"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def export_chunks(documents, fields, export_format, compress=False):
+    chunks = (csv_chunks if export_format == 'csv' else ndjson_chunks)(documents, fields)
+    return gzip_chunks(chunks) if compress else chunks
+
+
+def export_filename(export_format, compress=False):
+    filename = f"service-requests-{date.today().isoformat()}.{EXPORT_FORMATS[export_format][1]}"
+    return filename + '.gz' if compress else filename
+
+
+def parse_export_date(value, end=False):
+    """ISO 8601 date or datetime as a naive UTC datetime; a bare date given as `end` includes that whole day"""
+    if not value:
+        return None
+    if len(value) == 10:
+        day = date.fromisoformat(value)
+        if end:
+            day += timedelta(days=1)
+        return datetime.combine(day, time.min)
+    timestamp = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if timestamp.tzinfo:
+        timestamp = timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+    return timestamp
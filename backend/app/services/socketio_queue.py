@@ -0,0 +1,65 @@
+from app import json_provider
+from flask_socketio import SocketIO
+from socketio import PubSubManager
+import threading
+
+# Scheme of the in-process stand-in used by tests and single-host development
+IN_PROCESS_SCHEME = 'inprocess://'
+
+
+class InProcessManager(PubSubManager):
+    """Pub/sub client manager whose "queue" is a channel registry inside this process.
+
+    Several Socket.IO servers created in one process (e.g. by tests) fan out to each
+    other exactly as separate workers do through Redis, without a broker.
+
+    Flask-SocketIO's test_client refuses any pub/sub manager, this one included: tests
+    serve each SocketIO on a real HTTP server (async_mode='threading' with werkzeug's
+    make_server) and connect python-socketio clients to it. Give each test its own
+    SOCKETIO_CHANNEL, servers stay registered on theirs for the life of the process.
+    """
+    name = 'inprocess'
+
+    # channel -> inboxes of the servers listening on it
+    channels = {}
+    channels_lock = threading.Lock()
+
+    def initialize(self):
+        if not self.write_only:
+            # The inbox has to come from the server so it yields to eventlet/gevent
+            self.inbox = self.server.eio.create_queue()
+            with self.channels_lock:
+                self.channels.setdefault(self.channel, []).append(self.inbox)
+        super().initialize()
+
+    def _publish(self, data):
+        with self.channels_lock:
+            inboxes = list(self.channels.get(self.channel, ()))
+        for inbox in inboxes:
+            inbox.put(data)
+
+    def _listen(self):
+        while True:
+            yield self.inbox.get()
+
+
+def socketio_queue_options(config, write_only=False):
+    """SocketIO keyword arguments for SOCKETIO_MESSAGE_QUEUE, empty when it is not set"""
+    url = config.get('SOCKETIO_MESSAGE_QUEUE')
+    channel = config.get('SOCKETIO_CHANNEL', 'flask-socketio')
+    if not url:
+        return {}
+    if url.startswith(IN_PROCESS_SCHEME):
+        return {'client_manager': InProcessManager(channel=channel, write_only=write_only)}
+    # redis://, kafka://, zmq+tcp:// and kombu URLs are handled by Flask-SocketIO itself
+    return {'message_queue': url, 'channel': channel}
+
+
+def create_emitter(config):
+    """Write-only SocketIO for processes that publish events without serving clients"""
+    options = socketio_queue_options(config, write_only=True)
+    if not options:
+        raise ValueError('SOCKETIO_MESSAGE_QUEUE must be set to emit from outside the web workers')
+    emitter = SocketIO()
+    emitter.init_app(None, json=json_provider, **options)
+    return emitter
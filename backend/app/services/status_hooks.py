@@ -0,0 +1,100 @@
+from app import app, socketio
+from app.services.admin_events import publish_dashboard_delta, status_transition_counters
+from app.services.email_templates import email_templates
+from app.services.notification_service import send_email_notification
+from collections import namedtuple
+from datetime import datetime
+import threading
+import time
+
+# `request` is the document as written, `old_status` what it had before
+StatusTransition = namedtuple('StatusTransition', ['request', 'old_status', 'new_status'])
+
+
+class TransitionHooks:
+    """Side effects of request status changes, run after the write on a background task.
+
+    A failing hook is logged and counted; it never affects the write or the other hooks.
+    """
+
+    def __init__(self, socketio):
+        self.socketio = socketio
+        self.hooks = []
+        self.lock = threading.Lock()
+        self.counters = {'dispatched': 0, 'runs': 0, 'failures': 0, 'total_duration': 0.0}
+
+    def register(self, to=None):
+        """Decorator; the hook runs on transitions into one of the `to` statuses, or all of them"""
+        statuses = frozenset(to) if to else None
+
+        def decorator(hook):
+            self.hooks.append((hook, statuses))
+            return hook
+        return decorator
+
+    def dispatch(self, transition):
+        hooks = [hook for hook, statuses in self.hooks if statuses is None or transition.new_status in statuses]
+        if not hooks:
+            return
+        with self.lock:
+            self.counters['dispatched'] += 1
+        self.socketio.start_background_task(self._run, hooks, transition)
+
+    def stats(self):
+        with self.lock:
+            counters = dict(self.counters)
+        total_duration = counters.pop('total_duration')
+        counters['avg_duration_ms'] = round(total_duration / counters['runs'] * 1000, 2) if counters['runs'] else 0
+        counters['hooks'] = [hook.__name__ for hook, _ in self.hooks]
+        return counters
+
+    def _run(self, hooks, transition):
+        with app.app_context():
+            for hook in hooks:
+                started = time.monotonic()
+                failed = False
+                try:
+                    hook(transition)
+                except Exception as e:
+                    failed = True
+                    app.logger.error(f"Status hook {hook.__name__} failed for request {transition.request.get('_id')}: {e}")
+                with self.lock:
+                    self.counters['runs'] += 1
+                    self.counters['failures'] += failed
+                    self.counters['total_duration'] += time.monotonic() - started
+
+
+transition_hooks = TransitionHooks(socketio)
+
+
+@transition_hooks.register()
+def publish_transition(transition):
+    # Dashboard counters and the live request list of every connected admin
+    created_at = transition.request.get('created_at')
+    counts_today = created_at is not None and created_at.date() == datetime.now().date()
+    publish_dashboard_delta(
+        status_transition_counters(transition.old_status, transition.new_status, counts_today),
+        transition={'id': str(transition.request['_id']), 'from': transition.old_status, 'to': transition.new_status}
+    )
+
+
+@transition_hooks.register(to=['completed'])
+def send_completed_email(transition):
+    request = transition.request
+    status_email = email_templates.render('status_completed', request.get('language', 'fr'), {
+        'name': request['name'],
+        'address': request['address']
+    })
+    send_email_notification(status_email.subject, status_email.body, request['email'], html=status_email.html)
+
+
+@transition_hooks.register(to=['cancelled'])
+def send_cancelled_email(transition):
+    request = transition.request
+    language = request.get('language', 'fr')
+    status_email = email_templates.render('status_cancelled', language, {
+        'name': request['name'],
+        'address': request['address'],
+        'reason': request.get('admin_notes') or email_templates.translate('statusCancelled.noReason', language)
+    })
+    send_email_notification(status_email.subject, status_email.body, request['email'], html=status_email.html)
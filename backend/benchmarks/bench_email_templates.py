@@ -0,0 +1,214 @@
+"""Compare per-submission email rendering: inline f-strings vs. the compiled template registry.
+
+Usage (from backend/):  python benchmarks/bench_email_templates.py
+"""
+import os
+import sys
+import timeit
+from datetime import datetime
+
+os.environ.setdefault('MONGO_ENSURE_INDEXES', 'False')
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.services.email_templates import email_templates, SERVICE_TYPE_NAMES
+
+DATA = {
+    'name': 'Jean Dupont',
+    'email': 'jean.dupont@example.com',
+    'phone': '+32 470 12 34 56',
+    'address': 'Rue de la Loi 16, 1000 Bruxelles',
+    'service_type': 'vide_maison',
+    'message': 'Maison de 3 chambres a vider avant la fin du mois, acces par le garage.' * 3
+}
+
+
+def legacy_render(data, user_language):
+    """Body of create_service_request before the template registry, minus the sends"""
+    service_types = {
+        'vide_maison': 'Vide Maison',
+        'vide_appartement': 'Vide Appartement',
+        'vide_grenier': 'Vide Grenier',
+        'vide_locaux': 'Vide Locaux Professionnels',
+        'vide_bureau': 'Vide Bureau',
+        'nettoyage': 'Nettoyage'
+    }
+    service_type_name = service_types.get(data['service_type'], data['service_type'])
+
+    # Email translations
+    translations = {
+        'en': {
+            'admin_subject': 'New Service Request',
+            'admin_title': '🔔 New Service Request',
+            'admin_name': 'Name',
+            'admin_email': 'Email',
+            'admin_phone': 'Phone',
+            'admin_service': 'Service',
+            'admin_address': 'Address',
+            'admin_message': 'Message',
+            'admin_submitted': 'Submitted on',
+            'user_subject': 'Confirmation of your service request - Vide Maison',
+            'user_title': 'Vide Maison',
+            'user_thank_you': 'Thank you for your request!',
+            'user_dear': f'Dear {data["name"]},',
+            'user_received': f'We have received your request for <strong>{service_type_name}</strong> at <strong>{data["address"]}</strong>.',
+            'user_contact': f'Our team will review your request and contact you within <strong>24 hours</strong> at <strong>{data["phone"]}</strong>.',
+            'user_details': 'Your request details:',
+            'user_service': 'Service',
+            'user_address': 'Address',
+            'user_message': 'Message',
+            'user_regards': 'Best regards,',
+            'user_team': 'The Vide Maison Team',
+            'user_footer': 'Vide Maison - Professional Clearance Service<br>Brussels and Surroundings'
+        },
+        'fr': {
+            'admin_subject': 'Nouvelle Demande de Service',
+            'admin_title': '🔔 Nouvelle Demande de Service',
+            'admin_name': 'Nom',
+            'admin_email': 'Email',
+            'admin_phone': 'Téléphone',
+            'admin_service': 'Service',
+            'admin_address': 'Adresse',
+            'admin_message': 'Message',
+            'admin_submitted': 'Soumis le',
+            'user_subject': 'Confirmation de votre demande de service - Vide Maison',
+            'user_title': 'Vide Maison',
+            'user_thank_you': 'Merci pour votre demande!',
+            'user_dear': f'Cher(e) {data["name"]},',
+            'user_received': f'Nous avons bien reçu votre demande pour <strong>{service_type_name}</strong> à <strong>{data["address"]}</strong>.',
+            'user_contact': f'Notre équipe examinera votre demande et vous contactera dans les <strong>24 heures</strong> au <strong>{data["phone"]}</strong>.',
+            'user_details': 'Détails de votre demande:',
+            'user_service': 'Service',
+            'user_address': 'Adresse',
+            'user_message': 'Message',
+            'user_regards': 'Cordialement,',
+            'user_team': "L'équipe Vide Maison",
+            'user_footer': 'Vide Maison - Service Professionnel de Débarras<br>Bruxelles et Environs'
+        },
+        'nl': {
+            'admin_subject': 'Nieuwe Serviceaanvraag',
+            'admin_title': '🔔 Nieuwe Serviceaanvraag',
+            'admin_name': 'Naam',
+            'admin_email': 'Email',
+            'admin_phone': 'Telefoon',
+            'admin_service': 'Dienst',
+            'admin_address': 'Adres',
+            'admin_message': 'Bericht',
+            'admin_submitted': 'Ingediend op',
+            'user_subject': 'Bevestiging van uw serviceaanvraag - Vide Maison',
+            'user_title': 'Vide Maison',
+            'user_thank_you': 'Bedankt voor uw aanvraag!',
+            'user_dear': f'Beste {data["name"]},',
+            'user_received': f'We hebben uw aanvraag voor <strong>{service_type_name}</strong> op <strong>{data["address"]}</strong> goed ontvangen.',
+            'user_contact': f'Ons team zal uw aanvraag bekijken en binnen <strong>24 uur</strong> contact met u opnemen op <strong>{data["phone"]}</strong>.',
+            'user_details': 'Details van uw aanvraag:',
+            'user_service': 'Dienst',
+            'user_address': 'Adres',
+            'user_message': 'Bericht',
+            'user_regards': 'Met vriendelijke groet,',
+            'user_team': 'Het Vide Maison Team',
+            'user_footer': 'Vide Maison - Professionele Ontruimingsdienst<br>Brussel en Omgeving'
+        }
+    }
+
+    # Default to French if language not available
+    lang = user_language if user_language in translations else 'fr'
+    trans = translations[lang]
+
+    # Send email notification to admin with HTML template in admin language (always French)
+    admin_email_html = f"""
+    <html>
+        <body style="font-family: Arial, sans-serif; background-color: #f4f4f4; padding: 20px;">
+            <div style="max-width: 600px; margin: 0 auto; background-color: white; border-radius: 10px; padding: 30px; box-shadow: 0 2px 10px rgba(0,0,0,0.1);">
+                <h2 style="color: #d4af37; border-bottom: 2px solid #d4af37; padding-bottom: 10px;">{translations['fr']['admin_title']}</h2>
+                <div style="margin: 20px 0;">
+                    <p style="margin: 10px 0;"><strong>{translations['fr']['admin_name']}:</strong> {data['name']}</p>
+                    <p style="margin: 10px 0;"><strong>{translations['fr']['admin_email']}:</strong> {data['email']}</p>
+                    <p style="margin: 10px 0;"><strong>{translations['fr']['admin_phone']}:</strong> {data['phone']}</p>
+                    <p style="margin: 10px 0;"><strong>{translations['fr']['admin_service']}:</strong> {service_type_name}</p>
+                    <p style="margin: 10px 0;"><strong>{translations['fr']['admin_address']}:</strong> {data['address']}</p>
+                    <p style="margin: 10px 0;"><strong>{translations['fr']['admin_message']}:</strong> {data['message']}</p>
+                    <p style="margin: 10px 0;"><strong>Langue/Language:</strong> {lang.upper()}</p>
+                </div>
+                <div style="margin-top: 30px; padding-top: 20px; border-top: 1px solid #eee;">
+                    <p style="color: #666; font-size: 12px;">{translations['fr']['admin_submitted']}: {datetime.now().strftime('%d/%m/%Y à %H:%M')}</p>
+                </div>
+            </div>
+        </body>
+    </html>
+    """
+
+    admin = (translations['fr']['admin_subject'], admin_email_html)
+
+    # Send confirmation email to user with HTML template in user's language
+    customer_email_html = f"""
+    <html>
+        <body style="font-family: Arial, sans-serif; background-color: #f4f4f4; padding: 20px;">
+            <div style="max-width: 600px; margin: 0 auto; background-color: white; border-radius: 10px; padding: 30px; box-shadow: 0 2px 10px rgba(0,0,0,0.1);">
+                <h2 style="color: #d4af37; text-align: center;">{trans['user_title']}</h2>
+                <h3 style="color: #333;">{trans['user_thank_you']}</h3>
+                <p style="color: #666; line-height: 1.6;">
+                    {trans['user_dear']}
+                </p>
+                <p style="color: #666; line-height: 1.6;">
+                    {trans['user_received']}
+                </p>
+                <p style="color: #666; line-height: 1.6;">
+                    {trans['user_contact']}
+                </p>
+                <div style="background-color: #f9f9f9; border-left: 4px solid #d4af37; padding: 15px; margin: 20px 0;">
+                    <p style="margin: 0; color: #333;"><strong>{trans['user_details']}</strong></p>
+                    <p style="margin: 5px 0; color: #666;">{trans['user_service']}: {service_type_name}</p>
+                    <p style="margin: 5px 0; color: #666;">{trans['user_address']}: {data['address']}</p>
+                    <p style="margin: 5px 0; color: #666;">{trans['user_message']}: {data['message']}</p>
+                </div>
+                <p style="color: #666; line-height: 1.6;">
+                    {trans['user_regards']}<br>
+                    <strong>{trans['user_team']}</strong>
+                </p>
+                <div style="margin-top: 30px; padding-top: 20px; border-top: 1px solid #eee; text-align: center;">
+                    <p style="color: #999; font-size: 12px;">
+                        {trans['user_footer']}
+                    </p>
+                </div>
+            </div>
+        </body>
+    </html>
+    """
+
+    # Create plain text version for fallback
+    plain_text = f"{trans['user_dear']}\n\n{data['name'].replace('<strong>', '').replace('</strong>', '')},\n\n{trans['user_received'].replace('<strong>', '').replace('</strong>', '')}\n\n{trans['user_contact'].replace('<strong>', '').replace('</strong>', '')}\n\n{trans['user_details']}\n{trans['user_service']}: {service_type_name}\n{trans['user_address']}: {data['address']}\n{trans['user_message']}: {data['message']}\n\n{trans['user_regards']}\n{trans['user_team']}\n"
+
+    customer = (trans['user_subject'], plain_text, customer_email_html)
+    return admin, customer
+
+
+def registry_render(data, user_language):
+    lang = user_language if email_templates.has_language(user_language) else 'fr'
+    fields = {
+        'name': data['name'],
+        'email': data['email'],
+        'phone': data['phone'],
+        'address': data['address'],
+        'service': SERVICE_TYPE_NAMES.get(data['service_type'], data['service_type']),
+        'message': data['message'],
+        'language': lang.upper(),
+        'submitted_at': datetime.now().strftime('%d/%m/%Y à %H:%M')
+    }
+    admin = email_templates.render('new_request_admin', 'fr', fields)
+    customer = email_templates.render('request_confirmation', lang, fields)
+    return admin, customer
+
+
+if __name__ == '__main__':
+    number = 5000
+    rounds = 30
+    for language in ('fr', 'en', 'nl'):
+        # Interleaved rounds, best of each: a single long run is dominated by machine noise
+        legacy, registry = [], []
+        for _ in range(rounds):
+            legacy.append(timeit.timeit(lambda: legacy_render(DATA, language), number=number))
+            registry.append(timeit.timeit(lambda: registry_render(DATA, language), number=number))
+        legacy, registry = min(legacy), min(registry)
+        print(f"{language}: inline {legacy / number * 1e6:7.2f} us/submission | "
+              f"registry {registry / number * 1e6:7.2f} us/submission | "
+              f"speedup x{legacy / registry:.2f}")
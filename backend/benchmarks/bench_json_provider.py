@@ -0,0 +1,84 @@
+"""Serialization time of the admin request listing, per-document conversion vs. the JSON provider.
+
+Before: every document's _id was converted with str() in the model, then the
+listing went through Flask's default provider (stdlib json, datetimes as HTTP dates).
+After: documents go out as pymongo returns them through app.json_provider, with
+orjson when it is installed.
+
+Usage (from backend/):  python benchmarks/bench_json_provider.py [requests]
+"""
+import os
+import sys
+import timeit
+from datetime import datetime, timedelta
+
+os.environ.setdefault('MONGO_ENSURE_INDEXES', 'False')
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from bson import ObjectId
+from flask.json.provider import DefaultJSONProvider
+
+from app import app, json_provider
+
+REQUESTS = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+ROUNDS = 20
+
+
+def build_requests(count):
+    now = datetime.utcnow()
+    statuses = ['new', 'pending', 'in_progress', 'completed', 'cancelled']
+    return [
+        {
+            '_id': ObjectId(),
+            'name': f'Client {i}',
+            'email': f'client{i}@example.com',
+            'phone': f'+32 470 {i:06d}',
+            'address': f'Rue de la Loi {i}, 1000 Bruxelles',
+            'service_type': 'cleaning',
+            'language': 'fr',
+            'status': statuses[i % len(statuses)],
+            'read': i % 3 == 0,
+            'created_at': now - timedelta(minutes=i),
+            'updated_at': now - timedelta(minutes=i)
+        }
+        for i in range(count)
+    ]
+
+
+def before(provider, requests):
+    # What get_paginated_requests did on every call
+    requests = [dict(request) for request in requests]
+    for request in requests:
+        request['_id'] = str(request['_id'])
+    return provider.response({'requests': requests, 'total_pages': 1}).get_data()
+
+
+def after(provider, requests):
+    return provider.response({'requests': requests, 'total_pages': 1}).get_data()
+
+
+def measure(function, *args):
+    return min(timeit.repeat(lambda: function(*args), number=1, repeat=ROUNDS)) * 1000
+
+
+def main():
+    requests = build_requests(REQUESTS)
+    default = DefaultJSONProvider(app)
+    provider = json_provider.BSONJSONProvider(app)
+    encoder = 'orjson' if json_provider.orjson is not None else 'stdlib json'
+
+    with app.app_context():
+        before_ms = measure(before, default, requests)
+        after_ms = measure(after, provider, requests)
+        before_size = len(before(default, requests))
+        after_size = len(after(provider, requests))
+
+    print(f"admin listing of {REQUESTS} requests, best of {ROUNDS}\n")
+    print(f"{'':<28}{'ms':>10}{'bytes':>12}")
+    print(f"{'str(_id) loop + default':<28}{before_ms:>10.2f}{before_size:>12}")
+    print(f"{'provider (' + encoder + ')':<28}{after_ms:>10.2f}{after_size:>12}")
+    print(f"\nspeedup {before_ms / after_ms:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+"""Event-loop lag seen by chat traffic while logins hash passwords, inline vs. offloaded.
+
+A ticker greenlet stands in for Socket.IO chat traffic: it asks to wake up every 5 ms
+and records how late it actually runs while a burst of logins verifies passwords.
+
+Usage (from backend/, eventlet installed):  python benchmarks/bench_password_hashing.py
+"""
+import os
+import sys
+import time
+
+os.environ.setdefault('MONGO_ENSURE_INDEXES', 'False')
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import eventlet
+from passlib.hash import pbkdf2_sha256
+
+from app.services.password_hasher import PasswordHasher
+
+ROUNDS = 29000
+LOGINS = 20
+TICK = 0.005
+PASSWORD = 'Correct-Horse-Battery-9'
+STORED_HASH = pbkdf2_sha256.using(rounds=ROUNDS).hash(PASSWORD)
+
+
+def measure(verify):
+    lags = []
+    running = True
+
+    def chat_ticker():
+        while running:
+            start = time.perf_counter()
+            eventlet.sleep(TICK)
+            lags.append(time.perf_counter() - start - TICK)
+
+    ticker = eventlet.spawn(chat_ticker)
+    eventlet.sleep(0)
+    pool = eventlet.GreenPool()
+    started = time.perf_counter()
+    for _ in range(LOGINS):
+        pool.spawn(verify, PASSWORD, STORED_HASH)
+    pool.waitall()
+    elapsed = time.perf_counter() - started
+    running = False
+    ticker.wait()
+
+    lags.sort()
+    return {
+        'logins_per_s': LOGINS / elapsed,
+        'p50_ms': lags[len(lags) // 2] * 1000,
+        'p99_ms': lags[int(len(lags) * 0.99)] * 1000,
+        'max_ms': lags[-1] * 1000
+    }
+
+
+if __name__ == '__main__':
+    hasher = PasswordHasher(rounds=ROUNDS, max_workers=4, async_mode='eventlet')
+    runs = [
+        ('inline', pbkdf2_sha256.verify),
+        ('offloaded', hasher.verify)
+    ]
+    for name, verify in runs:
+        result = measure(verify)
+        print(f"{name:9s}: {result['logins_per_s']:6.1f} logins/s | chat lag "
+              f"p50 {result['p50_ms']:7.2f} ms  p99 {result['p99_ms']:7.2f} ms  max {result['max_ms']:7.2f} ms")
@@ -0,0 +1,144 @@
+"""Admin search latency on a synthetic corpus: regex scan vs. text index vs. fragment index.
+
+Seeds BENCH_MONGO_URI (a throwaway database, never MONGO_URI) with synthetic service
+requests, creates the ServiceRequest indexes, then times the same sampled queries three
+ways: the case-insensitive regex $or a search box would need without an index,
+ServiceRequest.search_requests in text mode and in fragment mode. Documents examined
+come from explain().
+
+Requires a running MongoDB.
+
+Usage (from backend/):  python benchmarks/bench_request_search.py [requests] [--drop]
+"""
+import os
+import random
+import re
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+os.environ['MONGO_URI'] = os.environ.get('BENCH_MONGO_URI', 'mongodb://localhost:27017/videmaison_bench')
+os.environ['MONGO_ENSURE_INDEXES'] = 'False'
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from bson import ObjectId
+
+from app import db
+from app.models.search_prefixes import search_prefixes, fragment_filter
+from app.models.service_request import ServiceRequest
+
+REQUESTS = int(sys.argv[1]) if len(sys.argv) > 1 and sys.argv[1].isdigit() else 500000
+DROP = '--drop' in sys.argv
+SEED_BATCH = 10000
+QUERIES = 50
+PER_PAGE = 20
+
+FIRST_NAMES = ['Jean', 'Marie', 'Pierre', 'Sophie', 'Luc', 'Camille', 'Thomas', 'Julie', 'Nicolas', 'Emma',
+               'Lars', 'Ingrid', 'Pieter', 'Anouk', 'Olivier', 'Chloe', 'Hugo', 'Lea', 'Karim', 'Sara']
+LAST_NAMES = ['Dupont', 'Martin', 'Bernard', 'Dubois', 'Lambert', 'Peeters', 'Janssens', 'Maes', 'Hansen',
+              'Olsen', 'Leroy', 'Moreau', 'Fontaine', 'Girard', 'Mercier', 'Claes', 'Willems', 'Berg']
+DOMAINS = ['gmail.com', 'hotmail.com', 'outlook.be', 'skynet.be', 'yahoo.fr', 'online.no']
+STREETS = ['Rue de la Loi', 'Avenue Louise', 'Chaussee de Wavre', 'Rue Neuve', 'Boulevard Anspach', 'Karl Johans gate']
+CITIES = ['Bruxelles', 'Liege', 'Namur', 'Gent', 'Antwerpen', 'Oslo']
+WORDS = ['maison', 'cave', 'grenier', 'meubles', 'cartons', 'urgent', 'demenagement', 'succession',
+         'appartement', 'bureau', 'nettoyage', 'piano', 'jardin', 'garage', 'etage', 'ascenseur']
+SERVICE_TYPES = ['vide_maison', 'vide_appartement', 'vide_grenier', 'vide_locaux', 'vide_bureau', 'nettoyage']
+STATUSES = ['new', 'pending', 'in_progress', 'completed', 'cancelled']
+
+
+def build_request(rng, i, now):
+    first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+    email = f"{first}.{last}{i}@{rng.choice(DOMAINS)}".lower()
+    phone = f"+32 4{rng.randint(60, 99)} {rng.randint(10, 99)} {rng.randint(10, 99)} {rng.randint(10, 99)}"
+    created_at = now - timedelta(minutes=i)
+    return {
+        '_id': str(ObjectId()),
+        'name': f"{first} {last}",
+        'email': email,
+        'phone': phone,
+        'address': f"{rng.choice(STREETS)} {rng.randint(1, 300)}, {rng.choice(CITIES)}",
+        'service_type': rng.choice(SERVICE_TYPES),
+        'message': ' '.join(rng.choice(WORDS) for _ in range(rng.randint(5, 30))),
+        'language': rng.choice(['fr', 'en', 'nl', 'no']),
+        'status': rng.choice(STATUSES),
+        'read': rng.random() < 0.7,
+        'search_prefixes': search_prefixes(email, phone),
+        'created_at': created_at,
+        'updated_at': created_at
+    }
+
+
+def seed(rng):
+    existing = db.service_requests.estimated_document_count()
+    now = datetime.utcnow()
+    for start in range(existing, REQUESTS, SEED_BATCH):
+        db.service_requests.insert_many(
+            [build_request(rng, i, now) for i in range(start, min(start + SEED_BATCH, REQUESTS))],
+            ordered=False
+        )
+        print(f"\rseeded {min(start + SEED_BATCH, REQUESTS)}/{REQUESTS}", end='', flush=True)
+    print()
+    db.service_requests.create_indexes(ServiceRequest.INDEXES)
+
+
+def sample_queries(rng):
+    """label -> (query, mode) pairs taken from stored requests"""
+    documents = list(db.service_requests.aggregate([{'$sample': {'size': QUERIES}}]))
+    return {
+        'name word': [(doc['name'].split()[1], 'text') for doc in documents],
+        'email fragment': [(doc['email'].split('@')[0].split('.')[1][:6], 'fragment') for doc in documents],
+        'phone fragment': [(doc['phone'][-8:], 'fragment') for doc in documents]
+    }
+
+
+def regex_filter(query):
+    # Without an index every document is read and matched
+    pattern = {'$regex': re.escape(query), '$options': 'i'}
+    return {'$or': [{'name': pattern}, {'email': pattern}, {'phone': pattern}, {'address': pattern}]}
+
+
+def timed(function):
+    start = time.perf_counter()
+    function()
+    return (time.perf_counter() - start) * 1000
+
+
+def docs_examined(filter_query, sort):
+    cursor = db.service_requests.find(filter_query).limit(PER_PAGE + 1)
+    if sort:
+        cursor = cursor.sort(sort)
+    return cursor.explain()['executionStats']['totalDocsExamined']
+
+
+def main():
+    rng = random.Random(42)
+    seed(rng)
+    newest = [('created_at', -1), ('_id', -1)]
+
+    print(f"\n{REQUESTS} requests, {QUERIES} sampled queries per row, first page of {PER_PAGE}\n")
+    print(f"{'query':<16}{'method':<20}{'median ms':>12}{'p95 ms':>10}{'docs examined':>16}")
+    for label, queries in sample_queries(rng).items():
+        methods = [
+            ('regex scan', lambda q, m: list(
+                db.service_requests.find(regex_filter(q), ServiceRequest.LIST_PROJECTION).sort(newest).limit(PER_PAGE + 1)
+            ), lambda q, m: docs_examined(regex_filter(q), newest)),
+            ('indexed', lambda q, m: ServiceRequest.search_requests(q, mode=m, per_page=PER_PAGE),
+             lambda q, m: docs_examined(
+                 {'$text': {'$search': q}} if m == 'text' else fragment_filter(q),
+                 [] if m == 'text' else newest
+             ))
+        ]
+        for method, run, examine in methods:
+            timings = sorted(timed(lambda: run(query, mode)) for query, mode in queries)
+            examined = statistics.median(examine(query, mode) for query, mode in queries[:5])
+            name = f"{method} ({queries[0][1]})" if method == 'indexed' else method
+            print(f"{label:<16}{name:<20}{statistics.median(timings):>12.2f}"
+                  f"{timings[int(len(timings) * 0.95) - 1]:>10.2f}{examined:>16.0f}")
+
+    if DROP:
+        db.client.drop_database(db.name)
+
+
+if __name__ == '__main__':
+    main()
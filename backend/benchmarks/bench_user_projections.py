@@ -0,0 +1,89 @@
+"""BSON bytes returned per auth call, full user documents vs. the named projections.
+
+Builds a long-lived user (many login sessions, backup codes, security questions, 2FA)
+and sizes what each auth route pulls from MongoDB, with and without User.PROJECTIONS.
+/refresh and /profile go through User.get_principal: the 'principal' projection is read
+on a principal cache miss, nothing on a hit (the "cached" column).
+
+Usage (from backend/):  python benchmarks/bench_user_projections.py
+"""
+import os
+import sys
+from datetime import datetime, timedelta
+
+os.environ.setdefault('MONGO_ENSURE_INDEXES', 'False')
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import bson
+from bson import ObjectId
+
+from app.models.user import User
+
+LOGIN_SESSIONS = 500
+
+# (call, reads before, projections after, projections on a cache hit or None if uncached)
+# -- login used to read the user three times
+AUTH_CALLS = [
+    ('POST /login', [None, None, None], ['login'], None),
+    ('POST /refresh', [None], ['principal'], []),
+    ('GET /profile', [None], ['principal'], []),
+    ('verify_totp', [None], ['two_factor'], None)
+]
+
+
+def build_user():
+    now = datetime.utcnow()
+    return {
+        '_id': ObjectId(),
+        'email': 'client@example.com',
+        'password': '$pbkdf2-sha256$29000$' + 'a' * 22 + '$' + 'b' * 43,
+        'role': 'user',
+        'first_name': 'Camille',
+        'last_name': 'Dupont',
+        'phone': '+32 470 00 00 00',
+        'address': 'Rue de la Loi 16, 1000 Bruxelles',
+        'is_active': True,
+        'two_factor_enabled': True,
+        'totp_secret': 'JBSWY3DPEHPK3PXP' * 2,
+        'backup_codes': [f'{i:08x}' for i in range(10)],
+        'security_questions': [
+            {'question': f'Security question {i}?', 'answer_hash': 'c' * 64} for i in range(3)
+        ],
+        'failed_login_attempts': 0,
+        'account_locked_until': None,
+        'login_sessions': [
+            {
+                'session_id': str(ObjectId()),
+                'ip_address': f'192.168.{i % 255}.{i % 200}',
+                'user_agent': 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0 Safari/537.36',
+                'created_at': now - timedelta(hours=i),
+                'last_activity': now - timedelta(hours=i)
+            }
+            for i in range(LOGIN_SESSIONS)
+        ],
+        'last_login': now,
+        'created_at': now - timedelta(days=365),
+        'updated_at': now
+    }
+
+
+def project(document, projection):
+    if projection is None:
+        return document
+    fields = User.PROJECTIONS[projection]
+    return {key: value for key, value in document.items() if key == '_id' or key in fields}
+
+
+def main():
+    user = build_user()
+    print(f"user document with {LOGIN_SESSIONS} login sessions\n")
+    print(f"{'call':<16}{'before (bytes)':>16}{'after (bytes)':>16}{'ratio':>10}{'cached (bytes)':>16}")
+    for name, before, after, cached in AUTH_CALLS:
+        before_bytes = sum(len(bson.encode(project(user, p))) for p in before)
+        after_bytes = sum(len(bson.encode(project(user, p))) for p in after)
+        cached_bytes = '-' if cached is None else sum(len(bson.encode(project(user, p))) for p in cached)
+        print(f"{name:<16}{before_bytes:>16}{after_bytes:>16}{before_bytes / after_bytes:>9.0f}x{cached_bytes:>16}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,8 @@
+import os
+import sys
+
+# Set before the app loads .env, which never overrides the environment; the app
+# connects lazily and tests that need MongoDB bring their own client
+os.environ.setdefault('MONGO_URI', 'mongodb://localhost:27017/videmaison_test')
+os.environ.setdefault('MONGO_ENSURE_INDEXES', 'False')
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
@@ -0,0 +1,25 @@
+"""One web worker of the app, for the multi-process Socket.IO tests.
+
+Usage:  python tests/socketio_worker.py <port>
+
+Serves the real app on eventlet with SOCKETIO_MESSAGE_QUEUE taken from the
+environment, plus a `relay` event so a client can make this worker broadcast.
+"""
+import eventlet
+eventlet.monkey_patch()
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app import app, socketio
+
+
+@socketio.on('relay')
+def handle_relay(data):
+    socketio.emit(data['event'], data['payload'], to=data['room'])
+
+
+if __name__ == '__main__':
+    socketio.run(app, host='127.0.0.1', port=int(sys.argv[1]), log_output=False)
@@ -0,0 +1,117 @@
+"""Failed logins are counted atomically and lock the account at MAX_FAILED_LOGINS.
+
+Runs against mongomock when it is installed and against a real MongoDB at
+TEST_MONGO_URI when one answers (a throwaway database is created and dropped).
+"""
+import os
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import pytest
+from bson import ObjectId
+from pymongo import MongoClient
+from pymongo.errors import PyMongoError
+
+from app.models import user as user_module
+from app.models.user import User
+from app.services.password_hasher import password_hasher
+
+MONGO_URL = os.environ.get('TEST_MONGO_URI', 'mongodb://localhost:27017')
+PARALLEL_ATTEMPTS = 40
+PASSWORD = 'Correct-horse-7'
+
+
+@pytest.fixture(params=['mongomock', 'mongodb'])
+def db(request, monkeypatch):
+    if request.param == 'mongomock':
+        mongomock = pytest.importorskip('mongomock')
+        client = mongomock.MongoClient()
+    else:
+        client = MongoClient(MONGO_URL, serverSelectionTimeoutMS=1000)
+        try:
+            client.admin.command('ping')
+        except PyMongoError:
+            pytest.skip(f'No MongoDB at {MONGO_URL} (set TEST_MONGO_URI)')
+    database = client[f'videmaison_test_{uuid.uuid4().hex}']
+    monkeypatch.setattr(user_module, 'db', database)
+    yield database
+    client.drop_database(database.name)
+
+
+@pytest.fixture
+def user_id(db):
+    return str(db.users.insert_one({
+        'email': 'lockout@example.com',
+        'password': password_hasher.hash(PASSWORD),
+        'failed_login_attempts': 0,
+        'account_locked_until': None
+    }).inserted_id)
+
+
+def stored(db, user_id):
+    return db.users.find_one({'_id': ObjectId(user_id)})
+
+
+def test_account_locks_at_max_failed_logins(db, user_id):
+    # MongoDB keeps milliseconds, so compare against a value it stores exactly
+    now = datetime.utcnow().replace(microsecond=0)
+    for _ in range(1, User.MAX_FAILED_LOGINS):
+        assert User.record_failed_login(user_id, now) == 'invalid'
+        assert stored(db, user_id)['account_locked_until'] is None
+
+    assert User.record_failed_login(user_id, now) == 'invalid'
+    user = stored(db, user_id)
+    assert user['failed_login_attempts'] == User.MAX_FAILED_LOGINS
+    assert user['account_locked_until'] == now + User.LOCKOUT_DURATION
+
+    assert User.record_failed_login(user_id, now) == 'locked'
+    assert stored(db, user_id)['failed_login_attempts'] == User.MAX_FAILED_LOGINS
+
+
+def test_parallel_failures_never_count_past_the_lock(db, user_id):
+    now = datetime.utcnow().replace(microsecond=0)
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        outcomes = list(pool.map(lambda _: User.record_failed_login(user_id, now), range(PARALLEL_ATTEMPTS)))
+
+    assert outcomes.count('invalid') == User.MAX_FAILED_LOGINS
+    assert outcomes.count('locked') == PARALLEL_ATTEMPTS - User.MAX_FAILED_LOGINS
+    user = stored(db, user_id)
+    assert user['failed_login_attempts'] == User.MAX_FAILED_LOGINS
+    assert user['account_locked_until'] == now + User.LOCKOUT_DURATION
+
+
+def test_expired_lock_restarts_the_count(db, user_id):
+    now = datetime.utcnow().replace(microsecond=0)
+    db.users.update_one({'_id': ObjectId(user_id)}, {'$set': {
+        'failed_login_attempts': User.MAX_FAILED_LOGINS,
+        'account_locked_until': now - timedelta(seconds=1)
+    }})
+
+    assert User.record_failed_login(user_id, now) == 'invalid'
+    user = stored(db, user_id)
+    assert user['failed_login_attempts'] == 1
+    assert user['account_locked_until'] is None
+
+
+def test_successful_login_resets_the_count(db, user_id):
+    User.record_failed_login(user_id)
+
+    assert User.authenticate('lockout@example.com', PASSWORD)[0] == 'ok'
+    user = stored(db, user_id)
+    assert user['failed_login_attempts'] == 0
+    assert user['last_login'] is not None
+
+
+def test_correct_password_cannot_undo_a_lock_set_after_the_read(db, user_id, monkeypatch):
+    # The login read the account before parallel failures locked it
+    unlocked = stored(db, user_id)
+    monkeypatch.setattr(User, 'get_user_by_email', staticmethod(lambda email, projection=None: unlocked))
+    for _ in range(User.MAX_FAILED_LOGINS):
+        User.record_failed_login(user_id)
+
+    assert User.authenticate('lockout@example.com', PASSWORD)[0] == 'locked'
+    user = stored(db, user_id)
+    assert user['failed_login_attempts'] == User.MAX_FAILED_LOGINS
+    assert user['account_locked_until'] is not None
+    assert user.get('last_login') is None
@@ -0,0 +1,87 @@
+"""Redis presence: live connections never expire, those of dead workers stop counting.
+
+Runs against fakeredis when it is installed and a real Redis at TEST_REDIS_URL when
+one answers, each under its own key prefix.
+"""
+import os
+import time
+import uuid
+
+import pytest
+import redis
+import socketio
+
+from app.services.presence import RedisPresenceRegistry
+
+REDIS_URL = os.environ.get('TEST_REDIS_URL', 'redis://localhost:6379/15')
+
+
+class FastRegistry(RedisPresenceRegistry):
+    HEARTBEAT_INTERVAL = 0.2
+    HEARTBEAT_TTL = 1
+    KEY_TTL = 1
+
+
+@pytest.fixture(params=['fakeredis', 'redis'])
+def client(request):
+    if request.param == 'fakeredis':
+        fakeredis = pytest.importorskip('fakeredis')
+        client = fakeredis.FakeRedis()
+    else:
+        client = redis.Redis.from_url(REDIS_URL, socket_connect_timeout=1)
+        try:
+            client.ping()
+        except redis.RedisError:
+            pytest.skip(f'No Redis at {REDIS_URL} (set TEST_REDIS_URL)')
+    prefix = f'test-presence-{uuid.uuid4().hex}:'
+    yield client, prefix
+    for key in client.scan_iter(prefix + '*'):
+        client.delete(key)
+
+
+def registry(client, prefix):
+    return FastRegistry(client, socketio.Server(async_mode='threading'), prefix=prefix)
+
+
+def stop(worker):
+    # The heartbeat loop ends once pid no longer matches the one it was started for
+    worker.pid = None
+
+
+def test_open_connection_outlives_the_key_ttl(client):
+    worker = registry(*client)
+    worker.connect('user-1', 'sid-1')
+    try:
+        time.sleep(FastRegistry.KEY_TTL * 3)
+        assert worker.is_online('user-1')
+    finally:
+        stop(worker)
+
+
+def test_disconnect_takes_the_user_offline(client):
+    worker = registry(*client)
+    worker.connect('user-1', 'sid-1')
+    worker.connect('user-1', 'sid-2')
+    try:
+        worker.disconnect('user-1', 'sid-1')
+        assert worker.is_online('user-1')
+        worker.disconnect('user-1', 'sid-2')
+        assert not worker.is_online('user-1')
+    finally:
+        stop(worker)
+
+
+def test_connections_of_a_dead_worker_stop_counting(client):
+    redis_client, prefix = client
+    dead, alive = registry(redis_client, prefix), registry(redis_client, prefix)
+    # Only the missing heartbeat may take the user offline here
+    dead.KEY_TTL = 60
+    dead.connect('user-1', 'sid-1')
+    stop(dead)
+    try:
+        time.sleep(FastRegistry.HEARTBEAT_TTL * 2)
+        assert not alive.is_online('user-1')
+        assert alive.stats()['stale_sids'] == 1
+        assert redis_client.hlen(dead.user_key('user-1')) == 0
+    finally:
+        stop(alive)
@@ -0,0 +1,156 @@
+"""Socket.IO events reach clients connected to other servers through the message queue.
+
+Flask-SocketIO's test_client refuses any PubSubManager, so these tests run real
+servers and connect python-socketio clients to them over HTTP.
+"""
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+import uuid
+
+import pytest
+import redis
+import socketio
+from flask import Flask
+from flask_socketio import SocketIO, join_room
+from werkzeug.serving import make_server
+
+from app.services.socketio_queue import create_emitter, socketio_queue_options
+
+WORKER = os.path.join(os.path.dirname(__file__), 'socketio_worker.py')
+REDIS_URL = os.environ.get('TEST_REDIS_URL', 'redis://localhost:6379/15')
+TIMEOUT = 10
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_for(condition, timeout=TIMEOUT):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.05)
+    return False
+
+
+class RoomClient:
+    """python-socketio client that joins a room and records one event"""
+
+    def __init__(self, url, join_event, join_data, event='heard'):
+        self.received = []
+        self.client = socketio.Client()
+        self.client.on(event, self.received.append)
+        self.client.connect(url, wait_timeout=TIMEOUT)
+        # The ack confirms the server has put this client in the room
+        self.client.call(join_event, join_data, timeout=TIMEOUT)
+
+    def close(self):
+        self.client.disconnect()
+
+
+def queue_config(url):
+    # A channel per test, so servers left over from another test never receive its events
+    return {'SOCKETIO_MESSAGE_QUEUE': url, 'SOCKETIO_CHANNEL': f'test-{uuid.uuid4().hex}'}
+
+
+def start_in_process_server(config):
+    server_app = Flask(__name__)
+    server = SocketIO(server_app, async_mode='threading', **socketio_queue_options(config))
+
+    @server.on('join_test')
+    def handle_join(room):
+        join_room(room)
+        return True
+
+    @server.on('relay')
+    def handle_relay(data):
+        server.emit(data['event'], data['payload'], to=data['room'])
+
+    http = make_server('127.0.0.1', 0, server_app, threaded=True)
+    threading.Thread(target=http.serve_forever, daemon=True).start()
+    return f'http://127.0.0.1:{http.server_port}', http
+
+
+def test_inprocess_manager_fans_out_between_servers():
+    config = queue_config('inprocess://')
+    servers = [start_in_process_server(config) for _ in range(2)]
+    clients = [RoomClient(url, 'join_test', 'room1') for url, _ in servers]
+    try:
+        clients[0].client.emit('relay', {'event': 'heard', 'payload': {'from': 'server 1'}, 'room': 'room1'})
+        create_emitter(config).emit('heard', {'from': 'emitter'}, to='room1')
+
+        expected = [{'from': 'emitter'}, {'from': 'server 1'}]
+        assert wait_for(lambda: all(len(client.received) == 2 for client in clients))
+        for client in clients:
+            assert sorted(client.received, key=str) == expected
+    finally:
+        for client in clients:
+            client.close()
+        for _, http in servers:
+            http.shutdown()
+
+
+@pytest.fixture
+def redis_url():
+    try:
+        redis.Redis.from_url(REDIS_URL, socket_connect_timeout=1).ping()
+    except redis.RedisError:
+        pytest.skip(f'No Redis at {REDIS_URL} (set TEST_REDIS_URL)')
+    return REDIS_URL
+
+
+@pytest.fixture
+def workers(redis_url, tmp_path):
+    """Two app worker processes sharing one Redis channel: (config, [url, url])"""
+    config = queue_config(redis_url)
+    environment = dict(os.environ, **config)
+    processes, urls = [], []
+    try:
+        for _ in range(2):
+            port = free_port()
+            # The app writes a default .env in its working directory
+            processes.append(subprocess.Popen(
+                [sys.executable, WORKER, str(port)], cwd=tmp_path, env=environment,
+                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+            ))
+            urls.append(f'http://127.0.0.1:{port}')
+        for url in urls:
+            port = int(url.rsplit(':', 1)[1])
+            assert wait_for(lambda: socket_accepts(port)), f'worker on {url} did not start'
+        yield config, urls
+    finally:
+        for process in processes:
+            process.terminate()
+            process.wait(TIMEOUT)
+
+
+def socket_accepts(port):
+    try:
+        socket.create_connection(('127.0.0.1', port), timeout=0.2).close()
+        return True
+    except OSError:
+        return False
+
+
+def test_redis_queue_fans_out_between_worker_processes(workers):
+    config, urls = workers
+    # The app's own `join` event puts the connection in the user's room
+    clients = [RoomClient(url, 'join', {'user_id': 'user-1'}) for url in urls]
+    try:
+        clients[0].client.emit('relay', {'event': 'heard', 'payload': {'from': 'worker 1'}, 'room': 'user-1'})
+        create_emitter(config).emit('heard', {'from': 'emitter'}, to='user-1')
+
+        expected = [{'from': 'emitter'}, {'from': 'worker 1'}]
+        assert wait_for(lambda: all(len(client.received) == 2 for client in clients))
+        for client in clients:
+            assert sorted(client.received, key=str) == expected
+    finally:
+        for client in clients:
+            client.close()
@@ -233,24 +233,22 @@ const RequestDetails = () => {
     setUpdating(true);
     try {
       // Real API call to update request status and notes
-      await axios.put(`/api/admin/requests/${requestId}/status`, {
+      const response = await axios.put(`/api/admin/requests/${requestId}/status`, {
         status,
         admin_notes: adminNotes
       });
       
-      // Update local state with new values
-      setRequest(prev => ({
-        ...prev,
-        status,
-        admin_notes: adminNotes,
-        updated_at: new Date().toISOString()
-      }));
+      // The server answers with the request as written
+      setRequest(prev => ({ ...prev, ...response.data.request }));
       
       // Show success notification
       // You can add a notification system here
     } catch (error) {
       console.error('Failed to update request:', error);
-      // Show error notification
+      // A refused transition (409) leaves the request as it was
+      if (error.response?.status === 409) {
+        setStatus(request.status);
+      }
     } finally {
       setUpdating(false);
     }
@@ -141,18 +141,43 @@ const RequestsList = () => {
   const [requests, setRequests] = useState([]);
   const [loading, setLoading] = useState(true);
   const [searchTerm, setSearchTerm] = useState('');
+  const [searchQuery, setSearchQuery] = useState('');
   const [statusFilter, setStatusFilter] = useState('');
   const [currentPage, setCurrentPage] = useState(1);
   const [totalPages, setTotalPages] = useState(1);
   const { markAsRead } = useNotification();
   
+  // Search once the admin stops typing instead of on every keystroke
+  useEffect(() => {
+    const timer = setTimeout(() => {
+      setSearchQuery(searchTerm.trim());
+      setCurrentPage(1);
+    }, 300);
+    return () => clearTimeout(timer);
+  }, [searchTerm]);
+  
   useEffect(() => {
     fetchRequests();
-  }, [currentPage, statusFilter]);
+  }, [currentPage, statusFilter, searchQuery]);
   
   const fetchRequests = async () => {
     setLoading(true);
     try {
+      if (searchQuery) {
+        // Ranked server-side search, it only tells whether a next page exists
+        const response = await axios.get('/api/admin/requests/search', {
+          params: {
+            q: searchQuery,
+            page: currentPage,
+            status: statusFilter || undefined
+          }
+        });
+        
+        setRequests(response.data.requests || []);
+        setTotalPages(response.data.has_more ? currentPage + 1 : currentPage);
+        return;
+      }
+      
       // Real API call with pagination and filtering
       const response = await axios.get('/api/admin/requests', {
         params: {
@@ -204,16 +229,6 @@ const RequestsList = () => {
     return new Date(dateString).toLocaleDateString('fr-FR', options);
   };
   
-  const filteredRequests = requests.filter(request => {
-    const matchesSearch = searchTerm === '' || 
-      request.name.toLowerCase().includes(searchTerm.toLowerCase()) ||
-      request.email.toLowerCase().includes(searchTerm.toLowerCase());
-      
-    const matchesStatus = statusFilter === '' || request.status === statusFilter;
-    
-    return matchesSearch && matchesStatus;
-  });
-  
   return (
     <RequestsContainer>
       <h1>Demandes de Service</h1>
@@ -221,7 +236,7 @@ const RequestsList = () => {
       <FiltersContainer>
         <SearchInput 
           type="text" 
-          placeholder="Rechercher par nom ou email..."
+          placeholder="Rechercher par nom, email, téléphone ou adresse..."
           value={searchTerm}
           onChange={handleSearchChange}
         />
@@ -255,7 +270,7 @@ const RequestsList = () => {
               </tr>
             </TableHead>
             <TableBody>
-              {filteredRequests.map(request => (
+              {requests.map(request => (
                 <tr key={request._id}>
                   <td>{request.name}</td>
                   <td>{getServiceTypeName(request.service_type)}</td>
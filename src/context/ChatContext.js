@@ -1,36 +1,60 @@
-import React, { createContext, useContext, useState, useEffect } from 'react';
+import React, { createContext, useContext, useState, useEffect, useRef } from 'react';
 import axios from 'axios';
 import { useAuth } from './AuthContext';
 import { useSocket } from './SocketContext';
 
 const ChatContext = createContext();
 
+// Incoming messages are acknowledged once per conversation for each burst received in this window
+const READ_RECEIPT_DELAY_MS = 300;
+
 export const useChat = () => useContext(ChatContext);
 
 export const ChatProvider = ({ children }) => {
   const [conversations, setConversations] = useState([]);
   const [activeConversation, setActiveConversation] = useState(null);
   const [messages, setMessages] = useState([]);
+  const [olderMessagesCursor, setOlderMessagesCursor] = useState(null);
   const { isAuthenticated, user } = useAuth();
   const { socket, connected } = useSocket();
+  // Newest message received per conversation, not yet marked read
+  const pendingReads = useRef({});
+  const readTimer = useRef(null);
+
+  useEffect(() => () => clearTimeout(readTimer.current), []);
 
   useEffect(() => {
     if (!socket || !connected || !isAuthenticated || !user) return;
 
-    // Listen for new messages
-    socket.on('new_message', (message) => {
+    const handleNewMessage = (message) => {
+      if (message.cursor) {
+        localStorage.setItem('lastMessageCursor', message.cursor);
+      }
+      
       if (activeConversation === message.sender_id) {
         setMessages(prev => [...prev, message]);
-        // Mark message as read
-        markMessageAsRead(message.id);
+        // Read up to this message; a replay of missed messages ends up as a single mark_read
+        scheduleMarkRead(message.sender_id, message.id);
       }
       
       // Update conversation list
       updateConversationWithMessage(message);
+    };
+
+    // Listen for new messages
+    socket.on('new_message', handleNewMessage);
+
+    // Messages that arrived while disconnected, replayed after join
+    socket.on('missed_messages', ({ messages: missed = [], cursor, has_more: hasMore }) => {
+      missed.forEach(handleNewMessage);
+      if (hasMore) {
+        socket.emit('join', { user_id: user.id, since: cursor });
+      }
     });
 
     return () => {
       socket.off('new_message');
+      socket.off('missed_messages');
     };
   }, [socket, connected, isAuthenticated, user, activeConversation]);
 
@@ -50,16 +74,54 @@ export const ChatProvider = ({ children }) => {
     
     try {
       const response = await axios.get(`http://localhost:5000/api/chat/messages/${userId}`);
-      setMessages(response.data);
+      setMessages(response.data.messages);
+      setOlderMessagesCursor(response.data.next_before);
       setActiveConversation(userId);
     } catch (error) {
       console.error('Failed to load messages:', error);
     }
   };
 
+  const loadOlderMessages = async () => {
+    if (!isAuthenticated || !activeConversation || !olderMessagesCursor) return;
+    
+    try {
+      const response = await axios.get(`http://localhost:5000/api/chat/messages/${activeConversation}`, {
+        params: { before: olderMessagesCursor }
+      });
+      setMessages(prev => [...response.data.messages, ...prev]);
+      setOlderMessagesCursor(response.data.next_before);
+    } catch (error) {
+      console.error('Failed to load older messages:', error);
+    }
+  };
+
+  // Send over the open socket and resolve with the server's ack, null if it cannot be used
+  const sendMessageOverSocket = (receiverId, content, messageType) => {
+    if (!socket || !connected) return Promise.resolve(null);
+    
+    return new Promise((resolve) => {
+      socket.timeout(5000).emit('send_message', {
+        receiver_id: receiverId,
+        content,
+        message_type: messageType
+      }, (err, ack) => {
+        resolve(err || !ack || ack.error ? null : ack);
+      });
+    });
+  };
+
   const sendMessage = async (receiverId, content, messageType = 'text') => {
     if (!isAuthenticated) return;
     
+    const ack = await sendMessageOverSocket(receiverId, content, messageType);
+    if (ack) {
+      setMessages(prev => [...prev, ack]);
+      updateConversationWithMessage(ack);
+      return ack;
+    }
+    
+    // HTTP fallback, e.g. while reconnecting or with an expired socket token
     try {
       const response = await axios.post(`http://localhost:5000/api/chat/messages/${receiverId}`, {
         content,
@@ -76,14 +138,33 @@ export const ChatProvider = ({ children }) => {
     }
   };
 
-  const markMessageAsRead = async (messageId) => {
+  // Moves the read watermark of the conversation up to a message, everything before it included
+  const markConversationRead = async (otherUserId, upTo) => {
+    if (socket && connected) {
+      socket.emit('mark_read', { user_id: otherUserId, up_to: upTo });
+      return;
+    }
+    
+    // HTTP fallback while the socket is reconnecting
     try {
-      await axios.put(`http://localhost:5000/api/chat/messages/${messageId}/read`);
+      await axios.put(`http://localhost:5000/api/chat/conversations/${otherUserId}/read`, { up_to: upTo });
     } catch (error) {
-      console.error('Failed to mark message as read:', error);
+      console.error('Failed to mark conversation as read:', error);
     }
   };
 
+  const scheduleMarkRead = (otherUserId, messageId) => {
+    pendingReads.current[otherUserId] = messageId;
+    if (readTimer.current) return;
+    
+    readTimer.current = setTimeout(() => {
+      const pending = pendingReads.current;
+      pendingReads.current = {};
+      readTimer.current = null;
+      Object.entries(pending).forEach(([otherUserId, upTo]) => markConversationRead(otherUserId, upTo));
+    }, READ_RECEIPT_DELAY_MS);
+  };
+
   const updateConversationWithMessage = (message) => {
     if (!user) return;
     
@@ -121,10 +202,12 @@ export const ChatProvider = ({ children }) => {
     conversations,
     activeConversation,
     messages,
+    hasOlderMessages: Boolean(olderMessagesCursor),
     loadConversations,
     loadMessages,
+    loadOlderMessages,
     sendMessage,
-    markMessageAsRead
+    markConversationRead
   };
 
   return <ChatContext.Provider value={value}>{children}</ChatContext.Provider>;
@@ -1,6 +1,7 @@
 import React, { createContext, useContext, useState, useEffect } from 'react';
 import { io } from 'socket.io-client';
 import { useAuth } from './AuthContext';
+import { useSocket } from './SocketContext';
 import axios from '../utils/axiosConfig';
 
 const NotificationContext = createContext();
@@ -10,15 +11,9 @@ export const useNotification = () => useContext(NotificationContext);
 export const NotificationProvider = ({ children }) => {
   const [notifications, setNotifications] = useState([]);
   const [unreadCount, setUnreadCount] = useState(0);
-  const [socket, setSocket] = useState(null);
+  const [dashboardStats, setDashboardStats] = useState(null);
   const { isAuthenticated, user } = useAuth();
-
-  // Fetch unread count on initial load
-  useEffect(() => {
-    if (isAuthenticated && user?.role === 'admin') {
-      fetchUnreadCount();
-    }
-  }, [isAuthenticated, user]);
+  const { socket } = useSocket();
 
   const fetchUnreadCount = async () => {
     try {
@@ -29,47 +24,70 @@ export const NotificationProvider = ({ children }) => {
     }
   };
 
+  // Admin namespace: one snapshot on connect, then dashboard_delta pushes instead of polling
   useEffect(() => {
-    // Initialize socket connection
-    const newSocket = io('http://localhost:5000');
-    setSocket(newSocket);
+    if (!isAuthenticated || user?.role !== 'admin') return;
+
+    const adminSocket = io(`${process.env.REACT_APP_API_URL || 'http://localhost:5000'}/admin`, {
+      transports: ['websocket', 'polling'],
+      // Read on every (re)connect so a refreshed access token is picked up
+      auth: (cb) => cb({ token: localStorage.getItem('token') }),
+      withCredentials: true
+    });
+
+    adminSocket.on('dashboard_snapshot', (snapshot) => {
+      setUnreadCount(snapshot.unreadCount);
+      setDashboardStats(snapshot.stats);
+    });
+
+    adminSocket.on('dashboard_delta', ({ counters }) => {
+      const { unreadCount: unreadDelta = 0, ...statsDelta } = counters;
+      if (unreadDelta) {
+        setUnreadCount(prev => Math.max(prev + unreadDelta, 0));
+      }
+      setDashboardStats(prev => {
+        if (!prev) return prev;
+        const next = { ...prev };
+        Object.entries(statsDelta).forEach(([key, delta]) => {
+          next[key] = (next[key] || 0) + delta;
+        });
+        return next;
+      });
+    });
+
+    // Fall back to a single fetch if the namespace refuses the connection
+    adminSocket.on('connect_error', fetchUnreadCount);
+
+    // Listen for new service requests, the unread counter comes with the delta
+    adminSocket.on('new_request', (data) => {
+      const newNotification = {
+        id: Date.now(),
+        type: 'new_request',
+        message: `New service request from ${data.name} for ${data.service_type}`,
+        data: data,
+        read: false,
+        timestamp: new Date()
+      };
+      
+      setNotifications(prev => [newNotification, ...prev]);
+      
+      // Show browser notification if supported
+      if ('Notification' in window && Notification.permission === 'granted') {
+        new Notification('New Service Request', {
+          body: `${data.name} requested ${data.service_type} service`,
+          icon: '/logo192.png'
+        });
+      }
+    });
 
     return () => {
-      if (newSocket) newSocket.disconnect();
+      adminSocket.disconnect();
     };
-  }, []);
+  }, [isAuthenticated, user]);
 
   useEffect(() => {
     if (!socket) return;
 
-    // Listen for new service requests (admin only)
-    if (isAuthenticated && user?.role === 'admin') {
-      socket.on('new_request', (data) => {
-        const newNotification = {
-          id: Date.now(),
-          type: 'new_request',
-          message: `New service request from ${data.name} for ${data.service_type}`,
-          data: data,
-          read: false,
-          timestamp: new Date()
-        };
-        
-        setNotifications(prev => [newNotification, ...prev]);
-        setUnreadCount(prev => prev + 1); // Increment unread count
-        
-        // Show browser notification if supported
-        if ('Notification' in window && Notification.permission === 'granted') {
-          new Notification('New Service Request', {
-            body: `${data.name} requested ${data.service_type} service`,
-            icon: '/logo192.png'
-          });
-        }
-      });
-
-      // Join admin room
-      socket.emit('join', { user_id: 'admin' });
-    }
-
     // Listen for request status updates (user notification)
     socket.on('request_update', (data) => {
       const newNotification = {
@@ -85,10 +103,9 @@ export const NotificationProvider = ({ children }) => {
     });
 
     return () => {
-      socket.off('new_request');
       socket.off('request_update');
     };
-  }, [socket, isAuthenticated, user]);
+  }, [socket]);
 
   const markAsRead = async (requestId) => {
     try {
@@ -103,9 +120,7 @@ export const NotificationProvider = ({ children }) => {
             : notification
         )
       );
-      
-      // Update unread count
-      fetchUnreadCount();
+      // The unread count follows from the dashboard_delta this triggers
     } catch (error) {
       console.error('Failed to mark request as read:', error);
     }
@@ -118,6 +133,7 @@ export const NotificationProvider = ({ children }) => {
   const value = {
     notifications,
     unreadCount,
+    dashboardStats,
     markAsRead,
     clearNotifications
   };
@@ -30,6 +30,8 @@ export const SocketProvider = ({ children }) => {
         reconnection: true,
         reconnectionDelay: 1000,
         reconnectionAttempts: 5,
+        // Authenticates the connection once, read on every (re)connect to pick up refreshed tokens
+        auth: (cb) => cb({ token: localStorage.getItem('token') }),
         withCredentials: true // Important for CORS
       });
 
@@ -39,8 +41,11 @@ export const SocketProvider = ({ children }) => {
         setConnected(true);
         setConnectionError(null);
         
-        // Join user's room
-        newSocket.emit('join', { user_id: user.id });
+        // Join user's room, replaying messages received since the last one seen
+        newSocket.emit('join', {
+          user_id: user.id,
+          since: localStorage.getItem('lastMessageCursor') || undefined
+        });
       });
 
       newSocket.on('disconnect', () => {
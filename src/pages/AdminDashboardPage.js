@@ -443,7 +443,18 @@ const AdminDashboardHome = () => {
     recentRequests: []
   });
   
+  const { dashboardStats } = useNotification();
+  
+  // Kept current by the admin socket's snapshot and deltas once connected
   useEffect(() => {
+    if (dashboardStats) {
+      setStats(dashboardStats);
+    }
+  }, [dashboardStats]);
+  
+  useEffect(() => {
+    if (dashboardStats) return;
+    
     const fetchStats = async () => {
       try {
         const response = await axios.get('/api/admin/dashboard/stats');